@@ -5,7 +5,7 @@ a = Analysis(
     ['Universal runtime installer.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('catalog.json', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
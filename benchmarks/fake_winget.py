@@ -0,0 +1,161 @@
+"""
+Scriptable stand-in for winget and msiexec, used by run_benchmarks.py.
+
+The benchmark puts 'winget' and 'msiexec' shims on PATH that run this script with the
+tool name as first argument. Behaviour is configured through environment variables:
+
+FAKE_WINGET_LATENCY        seconds every winget call spends before doing anything (source loading)
+FAKE_WINGET_INSTALL_SECONDS seconds an install or upgrade takes
+FAKE_WINGET_PROGRESS_RATE  progress bar redraws per second during installs
+FAKE_WINGET_OUTPUT_LINES   extra output lines printed by every install
+FAKE_WINGET_EXIT_CODES     "Package.Id=code,..." exit codes of failing installs
+FAKE_WINGET_DOWNLOAD_BYTES size of downloaded payloads
+FAKE_MSIEXEC_SECONDS       seconds a payload install takes
+FAKE_WINGET_STATE          JSON file with the installed packages {id: version}
+FAKE_WINGET_CALLS          file that gets one line per invocation (the subprocess count)
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+
+VERSION = "1.0.0"
+
+
+def env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def load_state():
+    path = os.environ.get("FAKE_WINGET_STATE")
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state):
+    path = os.environ.get("FAKE_WINGET_STATE")
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+
+def package_arg(args):
+    if "--id" in args:
+        return args[args.index("--id") + 1]
+    return args[1] if len(args) > 1 and not args[1].startswith("-") else None
+
+
+def exit_codes():
+    codes = {}
+    for item in filter(None, os.environ.get("FAKE_WINGET_EXIT_CODES", "").split(",")):
+        package_id, _, code = item.partition("=")
+        codes[package_id] = int(code, 0)
+    return codes
+
+
+def print_table(rows, available=False):
+    header = f"{'Name':<30}{'Id':<45}{'Version':<12}" + (f"{'Available':<12}" if available else "") + "Source"
+    print(header)
+    print("-" * len(header))
+    for package_id, version in rows:
+        line = f"{package_id.split('.')[-1]:<30}{package_id:<45}{version:<12}"
+        print(line + (f"{'':<12}" if available else "") + "winget")
+
+
+def install(args, state):
+    package_id = package_arg(args)
+    version = args[args.index("--version") + 1] if "--version" in args else VERSION
+    print(f"Found {package_id.split('.')[-1]} [{package_id}] Version {version}")
+    for i in range(int(os.environ.get("FAKE_WINGET_OUTPUT_LINES", "10"))):
+        print(f"Installer output line {i} for {package_id}")
+    seconds = env_float("FAKE_WINGET_INSTALL_SECONDS", "0.2")
+    rate = max(1.0, env_float("FAKE_WINGET_PROGRESS_RATE", "50"))
+    steps = max(1, int(seconds * rate))
+    for step in range(steps + 1):
+        done = 4.0 * step / steps
+        sys.stdout.write(f"\r  {'█' * int(done * 5):<20}{'▒' * (20 - int(done * 5))}  {done:.1f} MB / 4.0 MB")
+        sys.stdout.flush()
+        if step < steps:
+            time.sleep(seconds / steps)
+    print()
+    code = exit_codes().get(package_id, 0)
+    if code:
+        sys.stderr.write(f"Installer failed with exit code: {code}\n")
+        return code
+    state[package_id] = version
+    save_state(state)
+    print("Successfully installed")
+    return 0
+
+
+def download(args):
+    package_id = package_arg(args)
+    version = args[args.index("--version") + 1] if "--version" in args else VERSION
+    target = args[args.index("--download-directory") + 1]
+    size = int(os.environ.get("FAKE_WINGET_DOWNLOAD_BYTES", str(1024 * 1024)))
+    data = (package_id + version).encode() * (size // len(package_id + version) + 1)
+    data = data[:size]
+    with open(os.path.join(target, f"{package_id}_{version}.msi"), "wb") as f:
+        f.write(data)
+    with open(os.path.join(target, f"{package_id}_{version}.yaml"), "w", encoding="utf-8") as f:
+        f.write(f"PackageIdentifier: {package_id}\nPackageVersion: {version}\nInstallerType: msi\n"
+                f"InstallerSha256: {hashlib.sha256(data).hexdigest().upper()}\n")
+    print(f"Installer downloaded: {target}")
+    return 0
+
+
+def winget(args):
+    time.sleep(env_float("FAKE_WINGET_LATENCY", "0.1"))
+    if args[:1] == ["--version"]:
+        print(f"v{VERSION}")
+        return 0
+    command = args[0] if args else ""
+    state = load_state()
+    if command == "list":
+        print_table(sorted(state.items()))
+        return 0
+    if command == "upgrade" and package_arg(args) is None:
+        # 'winget upgrade' without a package lists pending upgrades: none.
+        print_table([], available=True)
+        return 0
+    if command in ("install", "upgrade"):
+        return install(args, state)
+    if command == "download":
+        return download(args)
+    if command == "import":
+        with open(args[args.index("--import-file") + 1], encoding="utf-8") as f:
+            manifest = json.load(f)
+        codes = exit_codes()
+        for package in manifest["Sources"][0]["Packages"]:
+            if not codes.get(package["PackageIdentifier"]):
+                state[package["PackageIdentifier"]] = package.get("Version", VERSION)
+        save_state(state)
+        time.sleep(env_float("FAKE_WINGET_INSTALL_SECONDS", "0.2"))
+        return 0
+    if command == "source":
+        return 0
+    print(f"Unrecognized command: {' '.join(args)}")
+    return 0x8A150001
+
+
+def msiexec(args):
+    time.sleep(env_float("FAKE_MSIEXEC_SECONDS", "0.1"))
+    return 0
+
+
+def main():
+    tool, args = sys.argv[1], sys.argv[2:]
+    calls = os.environ.get("FAKE_WINGET_CALLS")
+    if calls:
+        with open(calls, "a", encoding="utf-8") as f:
+            f.write(json.dumps([tool] + args) + "\n")
+    code = winget(args) if tool == "winget" else msiexec(args)
+    # POSIX only keeps the low byte of an exit code.
+    sys.exit(code if os.name == "nt" else code & 0xFF)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Benchmark the installer's own overhead against a scriptable fake winget (plain Linux is enough).
+
+Every scenario runs in a fresh interpreter with fake 'winget' and 'msiexec' commands on
+PATH (see fake_winget.py) and its own TEMP directory, and reports wall time, peak RSS,
+the number of processes started and, for the GUI, the latency of the UI event loop.
+The GUI runs headless: ttkbootstrap and tkinter are replaced by stubs and the Tk event
+loop by a timer loop, so the numbers cover the installer's UI work but not Tk drawing.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json
+
+--compare exits with 1 if a scenario is slower or uses more memory than the baseline
+by more than --tolerance, or starts more processes.
+"""
+import argparse
+import heapq
+import json
+import os
+import platform
+import queue
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+# Every catalog package, for scenarios that start with everything installed.
+ALL_PACKAGES = [
+    "Microsoft.DirectX", "Oracle.JavaRuntimeEnvironment", "Microsoft.DotNet.DesktopRuntime.8", "OpenAL.OpenAL",
+    "Microsoft.XNARedist", "Microsoft.VCRedist.2010.x64", "Microsoft.VCRedist.2010.x86", "Microsoft.VCRedist.2012.x64",
+    "Microsoft.VCRedist.2012x86", "Microsoft.VCRedist.2013.x64", "Microsoft.VCRedist.2013.x86",
+    "Microsoft.VCRedist.2015+.x64", "Microsoft.VCRedist.2015+.x86",
+]
+
+SCENARIOS = {
+    "silent_parallel": {"mode": "silent", "args": ["--reinstall"]},
+    "silent_serial": {"mode": "silent", "args": ["--reinstall", "--download-workers", "0"]},
+    "silent_bulk": {"mode": "silent", "args": ["--bulk"]},
+    "silent_up_to_date": {"mode": "silent", "args": [], "installed": ALL_PACKAGES},
+    "silent_failures": {
+        "mode": "silent",
+        "args": ["--reinstall", "--download-workers", "0"],
+        "env": {"FAKE_WINGET_EXIT_CODES": "Microsoft.DirectX=1,OpenAL.OpenAL=1"},
+    },
+    "silent_output_flood": {
+        "mode": "silent",
+        "args": ["--reinstall", "--download-workers", "0"],
+        "env": {"FAKE_WINGET_OUTPUT_LINES": "20000", "FAKE_WINGET_PROGRESS_RATE": "500"},
+    },
+    "gui_default": {"mode": "gui", "args": ["--reinstall"]},
+    "gui_log_flood": {
+        "mode": "gui",
+        "args": ["--reinstall", "--download-workers", "0", "--log-lines", "2000"],
+        "env": {"FAKE_WINGET_OUTPUT_LINES": "20000", "FAKE_WINGET_PROGRESS_RATE": "500"},
+    },
+}
+
+# Defaults of the fake winget; scenarios override single values.
+FAKE_ENV = {
+    "FAKE_WINGET_LATENCY": "0.1",
+    "FAKE_WINGET_INSTALL_SECONDS": "0.2",
+    "FAKE_WINGET_PROGRESS_RATE": "50",
+    "FAKE_WINGET_OUTPUT_LINES": "10",
+    "FAKE_WINGET_DOWNLOAD_BYTES": str(1024 * 1024),
+    "FAKE_MSIEXEC_SECONDS": "0.1",
+}
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * q / 100)))]
+
+
+# ----------------------------- HEADLESS GUI -----------------------------
+
+class StubWidget:
+    def __init__(self, *args, **kwargs):
+        self.options = dict(kwargs)
+
+    def config(self, **kwargs):
+        self.options.update(kwargs)
+
+    configure = config
+
+    def __setitem__(self, key, value):
+        self.options[key] = value
+
+    def __getitem__(self, key):
+        return self.options.get(key)
+
+    def __getattr__(self, name):
+        # pack(), grid(), bind(), tag_configure() and friends.
+        return lambda *args, **kwargs: None
+
+
+class StubText(StubWidget):
+    """Line model of a Tk Text widget, enough for the log panel."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lines = [""]
+
+    def insert(self, index, *chunks):
+        for text in chunks[::2]:
+            parts = text.split("\n")
+            self.lines[-1] += parts[0]
+            self.lines.extend(parts[1:])
+
+    def index(self, index):
+        return f"{len(self.lines)}.{len(self.lines[-1])}"
+
+    def delete(self, first, last=None):
+        del self.lines[:int(last.split(".")[0]) - 1]
+
+    def tag_names(self, index=None):
+        return ()
+
+    def tag_ranges(self, tag):
+        return ()
+
+
+class StubVar:
+    def __init__(self, value=None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class StubWindow(StubWidget):
+    """Replaces the Tk event loop: runs after() callbacks on time and measures them."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timers = []
+        self.sequence = 0
+        self.callback_seconds = []
+        self.lateness_seconds = []
+
+    def after(self, ms, func, *args):
+        self.sequence += 1
+        heapq.heappush(self.timers, (time.perf_counter() + ms / 1000, self.sequence, func, args))
+
+    def run(self, finished):
+        while self.timers or not finished():
+            if not self.timers:
+                time.sleep(0.005)
+                continue
+            due, _, func, args = heapq.heappop(self.timers)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            started = time.perf_counter()
+            self.lateness_seconds.append(max(0.0, started - due))
+            func(*args)
+            self.callback_seconds.append(time.perf_counter() - started)
+
+
+class TimedQueue(queue.Queue):
+    """Queue recording how long each message waited for the UI thread."""
+
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self.waits = []
+
+    def _put(self, item):
+        super()._put((time.perf_counter(), item))
+
+    def _get(self):
+        put_at, item = super()._get()
+        self.waits.append(time.perf_counter() - put_at)
+        return item
+
+
+def install_tk_stubs():
+    ttk = types.ModuleType("ttkbootstrap")
+    for name in ("Frame", "Label", "Checkbutton", "Progressbar", "Button"):
+        setattr(ttk, name, StubWidget)
+    ttk.ScrolledText = StubText
+    ttk.Window = StubWindow
+    ttk.BooleanVar = StubVar
+    ttk.NORMAL, ttk.DISABLED = "normal", "disabled"
+    constants = types.ModuleType("ttkbootstrap.constants")
+    constants.__all__ = []
+    messagebox = types.ModuleType("tkinter.messagebox")
+    for name in ("showinfo", "showwarning", "showerror"):
+        setattr(messagebox, name, lambda *args, **kwargs: None)
+    tkinter = types.ModuleType("tkinter")
+    tkinter.messagebox = messagebox
+    sys.modules.update({
+        "ttkbootstrap": ttk, "ttkbootstrap.constants": constants, "tkinter": tkinter, "tkinter.messagebox": messagebox
+    })
+
+
+def run_gui_scenario(options):
+    install_tk_stubs()
+    import installer_core
+    import installer_gui
+    root = StubWindow()
+    log_sink = installer_core.LogSink(os.path.join(os.getcwd(), "installer_log.txt"), header="Installation Log")
+    gui = installer_gui.InstallerGUI(root, options, log_sink=log_sink)
+    gui.queue = TimedQueue()
+    finished = {}
+    on_finished = gui.on_installation_finished
+
+    def record_finished(failed_programs, status="completed", error=None):
+        finished.update(failed=len(failed_programs), status=status)
+        on_finished(failed_programs, status, error)
+
+    gui.on_installation_finished = record_finished
+    gui.start_installation()
+    root.run(lambda: not gui.installing and gui.queue.empty())
+    log_sink.close()
+    return {
+        "failed": finished.get("failed"),
+        "status": finished.get("status"),
+        "ui": {
+            "callbacks": len(root.callback_seconds),
+            "callback_p95_ms": round(percentile(root.callback_seconds, 95) * 1000, 2),
+            "callback_max_ms": round(max(root.callback_seconds, default=0) * 1000, 2),
+            "lateness_p95_ms": round(percentile(root.lateness_seconds, 95) * 1000, 2),
+            "message_wait_p50_ms": round(percentile(gui.queue.waits, 50) * 1000, 2),
+            "message_wait_p95_ms": round(percentile(gui.queue.waits, 95) * 1000, 2),
+            "message_wait_max_ms": round(max(gui.queue.waits, default=0) * 1000, 2),
+            "messages": len(gui.queue.waits),
+            "log_panel_lines": len(gui.logger.lines),
+        },
+    }
+
+
+# ----------------------------- SCENARIO RUNNER -----------------------------
+
+def run_child(name):
+    """Run one scenario in this (fresh) interpreter and print its measurements as JSON."""
+    sys.path.insert(0, REPO_DIR)
+    scenario = SCENARIOS[name]
+    started = time.perf_counter()
+    import installer_core
+    if scenario["mode"] == "silent":
+        exit_code = installer_core.run_silent_install(installer_core.parse_options(["/silent"] + scenario["args"]))
+        result = {"exit_code": exit_code}
+    else:
+        result = run_gui_scenario(installer_core.parse_options(scenario["args"]))
+    result["wall_s"] = round(time.perf_counter() - started, 3)
+    # ru_maxrss is in KiB on Linux.
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print(json.dumps(result))
+
+
+def make_fake_bin(work_dir):
+    bin_dir = os.path.join(work_dir, "bin")
+    os.makedirs(bin_dir)
+    for tool in ("winget", "msiexec"):
+        path = os.path.join(bin_dir, tool)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(BENCH_DIR, "fake_winget.py")}" {tool} "$@"\n')
+        os.chmod(path, 0o755)
+    return bin_dir
+
+
+def run_scenario(name):
+    scenario = SCENARIOS[name]
+    with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as work_dir:
+        calls = os.path.join(work_dir, "calls.jsonl")
+        state = os.path.join(work_dir, "state.json")
+        with open(state, "w", encoding="utf-8") as f:
+            json.dump({package_id: "1.0.0" for package_id in scenario.get("installed", [])}, f)
+        env = dict(os.environ)
+        env.update(FAKE_ENV)
+        env.update(scenario.get("env", {}))
+        env.update({
+            "PATH": make_fake_bin(work_dir) + os.pathsep + env.get("PATH", ""),
+            "TMPDIR": work_dir,
+            "FAKE_WINGET_CALLS": calls,
+            "FAKE_WINGET_STATE": state,
+        })
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", name],
+            cwd=work_dir, env=env, capture_output=True, text=True
+        )
+        if process.returncode != 0:
+            raise RuntimeError(f"Scenario {name} crashed:\n{process.stdout}\n{process.stderr}")
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        with open(calls, encoding="utf-8") as f:
+            tools = [json.loads(line)[0] for line in f]
+        result["subprocesses"] = len(tools)
+        result["winget_calls"] = tools.count("winget")
+        return result
+
+
+def compare(results, baseline, tolerance):
+    """Return the regressions of results against baseline."""
+    regressions = []
+    for name, expected in baseline["scenarios"].items():
+        actual = results["scenarios"].get(name)
+        if actual is None:
+            continue
+        for metric in ("wall_s", "peak_rss_mb"):
+            if actual[metric] > expected[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {actual[metric]} > {expected[metric]} (+{tolerance:.0%})")
+        if actual["subprocesses"] > expected["subprocesses"]:
+            regressions.append(f"{name}: subprocesses {actual['subprocesses']} > {expected['subprocesses']}")
+        for metric in ("exit_code", "failed"):
+            if actual.get(metric) != expected.get(metric):
+                regressions.append(f"{name}: {metric} {actual.get(metric)} != {expected.get(metric)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only these scenarios")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare the results with")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown/growth (default 0.5 = 50%%)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child)
+        return 0
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fake_winget": FAKE_ENV,
+        "scenarios": {},
+    }
+    for name in args.scenario or SCENARIOS:
+        result = results["scenarios"][name] = run_scenario(name)
+        ui = result.get("ui", {})
+        print(f"{name:<22} {result['wall_s']:>7.2f} s  {result['peak_rss_mb']:>6.1f} MB  "
+              f"{result['subprocesses']:>3} processes"
+              + (f"  UI callback max {ui['callback_max_ms']} ms, message wait p95 {ui['message_wait_p95_ms']} ms"
+                 if ui else ""))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
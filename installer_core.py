@@ -0,0 +1,3301 @@
+"""Headless install engine, program catalog and silent mode (must not import Tk)."""
+import os
+import re
+import gzip
+import json
+import base64
+import codecs
+import hashlib
+import atexit
+import asyncio
+import sys
+import ctypes
+import shutil
+import signal
+import sqlite3
+import subprocess
+import threading
+import queue
+import tempfile
+import time
+import uuid
+from collections import deque, namedtuple
+from contextlib import asynccontextmanager, closing, contextmanager, nullcontext
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+
+def is_admin():
+    """Check if the current user has administrative privileges."""
+    try:
+        return ctypes.windll.shell32.IsUserAnAdmin()
+    except Exception:
+        return False
+
+
+def run_as_admin():
+    """Re-launch the script with administrative privileges."""
+    script = os.path.abspath(sys.argv[0] or __file__)
+    params = ' '.join([f'"{arg}"' for arg in sys.argv[1:]])
+    try:
+        # Keep the working directory so relative paths such as --from-lock lock.json still resolve.
+        ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, f'"{script}" {params}', os.getcwd(), 1)
+    except Exception as e:
+        # Imported here so that silent runs never load Tk.
+        from tkinter import messagebox
+        messagebox.showerror("Error", f"Failed to elevate privileges:\n{str(e)}")
+    sys.exit()
+
+# ----------------------------- LOGGING -----------------------------
+
+LOG_FLUSH_LINES = 200
+LOG_FLUSH_INTERVAL = 0.5
+LOG_KEEP_ROTATED = 5
+
+
+def rotate_logs(path: str, keep: int = LOG_KEEP_ROTATED):
+    """Compress the previous log to '<path>.1.gz', shifting older archives and dropping the oldest."""
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return
+    try:
+        for n in range(keep, 0, -1):
+            archive = f"{path}.{n}.gz"
+            if os.path.exists(archive):
+                if n == keep:
+                    os.remove(archive)
+                else:
+                    os.replace(archive, f"{path}.{n + 1}.gz")
+        if keep > 0:
+            with open(path, "rb") as src, gzip.open(f"{path}.1.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        os.remove(path)
+    except OSError as e:
+        print("Failed to rotate log file:", e)
+
+
+class LogSink:
+    """
+    Buffered log file shared by GUI and silent mode.
+
+    write() only appends to an in-memory batch; a writer thread flushes it once
+    flush_lines are pending or flush_interval has passed. close() (also run at exit)
+    writes what is left and fsyncs the file. A new sink rotates the previous log away;
+    with append it adds to the existing log instead.
+    """
+
+    def __init__(self, path: str, header: str = None, flush_lines=LOG_FLUSH_LINES,
+                 flush_interval=LOG_FLUSH_INTERVAL, keep=LOG_KEEP_ROTATED, append: bool = False):
+        self.path = path
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._closed = False
+        if not append:
+            rotate_logs(path, keep)
+        try:
+            self._file = open(path, "a" if append else "w", encoding="utf-8")
+        except OSError as e:
+            print("Failed to open log file:", e)
+            self._file = None
+        if header:
+            self.write(header)
+        self._thread = threading.Thread(target=self._writer, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, line: str):
+        with self._cond:
+            self._pending.append(line + "\n")
+            if len(self._pending) >= self.flush_lines:
+                self._cond.notify()
+
+    def _take(self) -> list:
+        with self._cond:
+            batch, self._pending = self._pending, []
+        return batch
+
+    def _write_batch(self, batch: list, durable=False):
+        with self._io_lock:
+            if self._file is None:
+                return
+            try:
+                if batch:
+                    self._file.write("".join(batch))
+                self._file.flush()
+                if durable:
+                    os.fsync(self._file.fileno())
+            except (OSError, ValueError) as e:
+                print("Failed to write to log file:", e)
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.flush_lines,
+                    timeout=self.flush_interval
+                )
+                closed = self._closed
+            self._write_batch(self._take())
+            if closed:
+                return
+
+    def flush(self):
+        """Write everything pending and push it to disk."""
+        self._write_batch(self._take(), durable=True)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        self.flush()
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# ----------------------------- TRACING -----------------------------
+
+class Tracer:
+    """
+    Record timing spans and write them as Chrome trace-event JSON.
+
+    The file opens in chrome://tracing or Perfetto. A tracer without a path is
+    disabled: span() still works but nothing is recorded.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.events = []
+        self._thread_names = {}
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    @contextmanager
+    def span(self, name: str, category: str = "installer", **args):
+        """Time the enclosed block; the yielded dict can be filled with extra span arguments."""
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            if self.enabled:
+                end = time.perf_counter()
+                thread = threading.current_thread()
+                with self._lock:
+                    self._thread_names.setdefault(thread.ident, thread.name)
+                    self.events.append({
+                        "name": name,
+                        "cat": category,
+                        "ph": "X",
+                        "ts": round((start - self._t0) * 1e6),
+                        "dur": round((end - start) * 1e6),
+                        "pid": os.getpid(),
+                        "tid": thread.ident,
+                        "args": args,
+                    })
+
+    def save(self):
+        """Write the recorded spans to the trace file (no-op when disabled)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            metadata = [
+                {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                for tid, name in self._thread_names.items()
+            ]
+            trace = {"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(trace, f)
+        except OSError as e:
+            print("Failed to write trace file:", e)
+
+
+# ----------------------------- PROCESS SUPERVISION -----------------------------
+
+DEFAULT_COMMAND_TIMEOUT = 1800
+DEFAULT_RUN_TIMEOUT = 0
+SUPERVISOR_POLL_INTERVAL = 0.2
+
+
+class CommandTimeout(Exception):
+    """A single command ran longer than the per-command timeout and was killed."""
+
+    def __init__(self, command: str, seconds: float):
+        super().__init__(f"{command} timed out after {seconds:g} s")
+        self.command = command
+        self.seconds = seconds
+
+
+class RunAborted(Exception):
+    """The run was cancelled or hit the whole-run watchdog; reason is "cancelled" or "timeout"."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def kill_process_tree(proc):
+    """
+    Kill a process together with everything it started (winget, msiexec, bootstrappers).
+
+    Windows uses 'taskkill /T'; elsewhere processes are started in their own session
+    by run_streaming, so the whole process group can be signalled.
+    """
+    signal_process_tree(proc)
+    proc.wait()
+
+
+def signal_process_tree(proc):
+    """Kill proc and its descendants without waiting; works for Popen and asyncio processes."""
+    if os.name == "nt":
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        )
+    else:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+    try:
+        proc.kill()
+    except OSError:
+        pass
+
+
+class ProcessSupervisor:
+    """
+    Enforce the per-command timeout and the whole-run watchdog, and cancel on request.
+
+    wait() replaces Popen.wait(): it polls the process every SUPERVISOR_POLL_INTERVAL
+    seconds, so cancel() or an expired deadline kills the process tree well within a second.
+    Timeouts of 0 (or None) disable the respective limit.
+    """
+
+    def __init__(self, command_timeout: float = DEFAULT_COMMAND_TIMEOUT, run_timeout: float = DEFAULT_RUN_TIMEOUT):
+        self.command_timeout = command_timeout
+        self.run_timeout = run_timeout
+        self.cancelled = threading.Event()
+        self.deadline = None
+
+    def start(self):
+        """Arm the whole-run watchdog."""
+        self.deadline = time.monotonic() + self.run_timeout if self.run_timeout else None
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def check(self):
+        """Raise RunAborted if the run was cancelled or its deadline has passed."""
+        if self.cancelled.is_set():
+            raise RunAborted("cancelled")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise RunAborted("timeout")
+
+    def wait(self, proc, command: str) -> int:
+        """Wait for proc and return its exit code, killing its process tree when a limit is hit."""
+        started = time.monotonic()
+        while True:
+            try:
+                return proc.wait(timeout=SUPERVISOR_POLL_INTERVAL)
+            except subprocess.TimeoutExpired:
+                pass
+            try:
+                self.check()
+            except RunAborted:
+                kill_process_tree(proc)
+                raise
+            if self.command_timeout and time.monotonic() - started >= self.command_timeout:
+                kill_process_tree(proc)
+                raise CommandTimeout(command, self.command_timeout)
+
+    async def sleep_async(self, seconds: float):
+        """Pause between retries, raising RunAborted as soon as the run is cancelled or its deadline passes."""
+        if self.deadline is not None:
+            seconds = max(0.0, min(seconds, self.deadline - time.monotonic()))
+        end = time.monotonic() + seconds
+        while not self.cancelled.is_set() and time.monotonic() < end:
+            await asyncio.sleep(min(SUPERVISOR_POLL_INTERVAL, end - time.monotonic()))
+        self.check()
+
+    async def wait_async(self, proc, command: str) -> int:
+        """wait() for an asyncio subprocess."""
+        started = time.monotonic()
+        while True:
+            try:
+                return await asyncio.wait_for(proc.wait(), SUPERVISOR_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                self.check()
+            except RunAborted:
+                signal_process_tree(proc)
+                await proc.wait()
+                raise
+            if self.command_timeout and time.monotonic() - started >= self.command_timeout:
+                signal_process_tree(proc)
+                await proc.wait()
+                raise CommandTimeout(command, self.command_timeout)
+
+
+# ----------------------------- SILENT MODE HELPERS -----------------------------
+
+# Number of output lines kept per stream for error reporting.
+OUTPUT_TAIL_LINES = 200
+
+PROGRESS_PERCENT_RE = re.compile(r"(\d{1,3}(?:\.\d+)?)\s*%")
+PROGRESS_BYTES_RE = re.compile(r"([\d.,]+)\s*([KMG]?B)\s*/\s*([\d.,]+)\s*([KMG]?B)", re.IGNORECASE)
+BYTE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+def parse_progress(line: str):
+    """Return the percentage reported by a winget progress line ('45%' or '1.5 MB / 3 MB'), or None."""
+    match = PROGRESS_BYTES_RE.search(line)
+    if match:
+        try:
+            done = float(match.group(1).replace(",", ".")) * BYTE_UNITS[match.group(2).upper()]
+            total = float(match.group(3).replace(",", ".")) * BYTE_UNITS[match.group(4).upper()]
+        except ValueError:
+            return None
+        return min(100.0, done / total * 100) if total else None
+    match = PROGRESS_PERCENT_RE.search(line)
+    if match:
+        return min(100.0, float(match.group(1)))
+    return None
+
+
+def _is_noise(line: str) -> bool:
+    """Spinner frames and progress bars redrawn by winget are not worth keeping."""
+    stripped = line.strip()
+    return not stripped or stripped in ("-", "\\", "|", "/") or "█" in stripped or "▒" in stripped
+
+
+class OutputTail:
+    """
+    Line splitter for one output stream of a command.
+
+    feed() takes raw chunks as they arrive: progress lines are passed to on_progress(percent)
+    and the last tail_lines meaningful lines are kept (None keeps everything).
+    """
+
+    def __init__(self, tail_lines=OUTPUT_TAIL_LINES, on_progress=None):
+        self.lines = deque(maxlen=tail_lines)
+        self.on_progress = on_progress
+        self.byte_count = 0
+        self._pending = ""
+        # Multi-byte characters (umlauts, progress bar glyphs) may straddle two chunks.
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def feed(self, chunk: bytes):
+        self.byte_count += len(chunk)
+        self._pending += self._decoder.decode(chunk)
+        # winget redraws progress in place with '\r', so treat it as a line break too.
+        *lines, self._pending = re.split(r"[\r\n]", self._pending)
+        for line in lines:
+            percent = parse_progress(line)
+            if percent is not None and self.on_progress:
+                self.on_progress(percent)
+            if not _is_noise(line):
+                self.lines.append(line.rstrip())
+
+    def close(self):
+        pending = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        if pending and not _is_noise(pending):
+            self.lines.append(pending.rstrip())
+
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+def _command_argv(command) -> list:
+    return command.split() if isinstance(command, str) else list(command)
+
+
+def run_streaming(command, on_progress=None, tail_lines=OUTPUT_TAIL_LINES, stats=None, supervisor=None, env=None):
+    """
+    Execute a command without a shell and stream its output, blocking the calling thread.
+
+    The install engine uses run_streaming_async(); this one is for the fleet transports,
+    which run one host per orchestrator thread. command is an argv list (catalog strings
+    are split on whitespace). stdout and stderr are read on background threads, progress
+    lines are passed to on_progress(percent) and only the last tail_lines lines of each
+    stream are kept (None keeps everything). If a stats dict is given, the total output
+    size is stored in stats["output_bytes"]. With a supervisor the process tree is killed
+    on timeout or cancel, raising CommandTimeout or RunAborted. env replaces the
+    environment of the process. Returns (stdout, stderr, returncode).
+    """
+    argv = _command_argv(command)
+    if supervisor:
+        supervisor.check()
+    try:
+        proc = subprocess.Popen(
+            argv,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            # Own process group, so kill_process_tree() also reaches the children.
+            start_new_session=os.name != "nt"
+        )
+    except OSError as e:
+        return "", str(e), 1
+    tails = (OutputTail(tail_lines, on_progress), OutputTail(tail_lines, on_progress))
+
+    def reader(stream, tail):
+        while True:
+            chunk = stream.read1(4096)
+            if not chunk:
+                break
+            tail.feed(chunk)
+        tail.close()
+        stream.close()
+
+    readers = [
+        threading.Thread(target=reader, args=(proc.stdout, tails[0]), daemon=True),
+        threading.Thread(target=reader, args=(proc.stderr, tails[1]), daemon=True),
+    ]
+    for thread in readers:
+        thread.start()
+    try:
+        code = supervisor.wait(proc, subprocess.list2cmdline(argv)) if supervisor else proc.wait()
+    finally:
+        for thread in readers:
+            # Supervised runs don't wait forever on a pipe a stray grandchild kept open.
+            thread.join(timeout=2 if supervisor else None)
+        if stats is not None:
+            stats["output_bytes"] = sum(tail.byte_count for tail in tails)
+    return tails[0].text(), tails[1].text(), code
+
+
+async def run_streaming_async(command, on_progress=None, tail_lines=OUTPUT_TAIL_LINES, stats=None, supervisor=None,
+                              env=None):
+    """
+    run_streaming() for the event loop: the process is started with asyncio.create_subprocess_exec
+    and its output is read by coroutines, so concurrent commands need no threads. A pipe a
+    stray grandchild keeps open is given up 2 seconds after the process exited (supervised runs).
+    """
+    argv = _command_argv(command)
+    if supervisor:
+        supervisor.check()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            start_new_session=os.name != "nt"
+        )
+    except OSError as e:
+        return "", str(e), 1
+    tails = (OutputTail(tail_lines, on_progress), OutputTail(tail_lines, on_progress))
+
+    async def reader(stream, tail):
+        while True:
+            chunk = await stream.read(4096)
+            if not chunk:
+                break
+            tail.feed(chunk)
+        tail.close()
+
+    readers = [asyncio.ensure_future(reader(stream, tail)) for stream, tail in zip((proc.stdout, proc.stderr), tails)]
+    try:
+        code = await supervisor.wait_async(proc, subprocess.list2cmdline(argv)) if supervisor else await proc.wait()
+    except asyncio.CancelledError:
+        # The task awaiting this command was cancelled: the command goes with it.
+        signal_process_tree(proc)
+        await proc.wait()
+        raise
+    finally:
+        _, pending = await asyncio.wait(readers, timeout=2 if supervisor else None)
+        for task in pending:
+            task.cancel()
+        if stats is not None:
+            stats["output_bytes"] = sum(tail.byte_count for tail in tails)
+    return tails[0].text(), tails[1].text(), code
+
+
+async def cancel_tasks(tasks):
+    """Cancel tasks that have not finished (killing their processes) and wait until they have."""
+    tasks = list(tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@contextmanager
+def command_span(tracer, span: str, command):
+    """
+    Trace span of one command. The caller stores the exit code in the yielded stats dict;
+    timeouts and aborts are recorded as the span status.
+    """
+    command_text = command if isinstance(command, str) else subprocess.list2cmdline(command)
+    with tracer.span(span, command=command_text) as span_args:
+        stats = {}
+        try:
+            yield stats
+        except CommandTimeout:
+            span_args.update(status="timeout", output_bytes=stats.get("output_bytes", 0))
+            raise
+        except RunAborted as e:
+            span_args.update(status=e.reason, output_bytes=stats.get("output_bytes", 0))
+            raise
+        span_args.update(exit_code=stats.get("exit_code"), output_bytes=stats.get("output_bytes", 0))
+
+
+async def run_command_async(command, on_progress=None, tracer=None, span="command", tail_lines=OUTPUT_TAIL_LINES,
+                            supervisor=None):
+    """Run a command returning (stdout, stderr, returncode), recorded as a trace span if a tracer is given."""
+    if tracer is None:
+        return await run_streaming_async(command, on_progress=on_progress, tail_lines=tail_lines, supervisor=supervisor)
+    with command_span(tracer, span, command) as stats:
+        out, err, code = await run_streaming_async(
+            command, on_progress=on_progress, tail_lines=tail_lines, stats=stats, supervisor=supervisor
+        )
+        stats["exit_code"] = code
+    return out, err, code
+
+
+def silent_log(msg: str, log_sink: LogSink):
+    ts = time.strftime('%Y-%m-%d %H:%M:%S')
+    line = f"[{ts}] {msg}"
+    print(line)
+    log_sink.write(line)
+
+
+# ----------------------------- PROGRAM CATALOG -----------------------------
+
+CATALOG_FILE = "catalog.json"
+CATALOG_FORMAT = 1
+CATALOG_ARCHITECTURES = ("x64", "x86", "arm64")
+CATALOG_KEY_RE = re.compile(r"^[a-z0-9][a-z0-9_.+-]*$")
+CATALOG_PROGRAM_FIELDS = ("key", "name", "group", "requires", "packages")
+CATALOG_PACKAGE_FIELDS = ("id", "arch", "args", "runtime", "min_version")
+CATALOG_VERSION_RE = re.compile(r"^\d+(\.\d+)*$")
+
+# Added to every winget command, so unattended runs never stop at a prompt.
+WINGET_AGREEMENT_FLAGS = ("--accept-source-agreements", "--accept-package-agreements")
+
+# The compiled catalog: install and upgrade are complete argv tuples, version is the
+# version a run pins the package to (None installs the latest). runtime names the
+# runtime family the package installs (e.g. "vc14"), see SYSTEM DETECTION.
+CatalogPackage = namedtuple("CatalogPackage", "id arch runtime min_version install upgrade version")
+CatalogProgram = namedtuple("CatalogProgram", "key name group requires packages")
+
+
+def _is_string_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) and item for item in value)
+
+
+def compile_catalog(data, source: str = CATALOG_FILE) -> tuple:
+    """
+    Validate a parsed catalog and compile it into a tuple of CatalogProgram.
+
+    Every package gets its 'winget install' and 'winget upgrade' argv built here, once.
+    Programs are ordered so that the programs they require come first; raises
+    ValueError naming the offending entry if the catalog is invalid.
+    """
+    def fail(message):
+        raise ValueError(f"{source}: {message}")
+
+    if not isinstance(data, dict) or data.get("format") != CATALOG_FORMAT:
+        fail(f"not a program catalog of format {CATALOG_FORMAT}")
+    default_args = data.get("install_args", [])
+    if not isinstance(default_args, list) or (default_args and not _is_string_list(default_args)):
+        fail("install_args must be a list of strings")
+    if not isinstance(data.get("programs"), list) or not data["programs"]:
+        fail("programs must be a non-empty list")
+    programs = {}
+    names = set()
+    package_ids = set()
+    for number, entry in enumerate(data["programs"], 1):
+        if not isinstance(entry, dict):
+            fail(f"program {number} must be an object")
+        key = entry.get("key")
+        if not isinstance(key, str) or not CATALOG_KEY_RE.match(key):
+            fail(f"program {number} needs a lowercase key")
+        unknown = sorted(set(entry) - set(CATALOG_PROGRAM_FIELDS))
+        if unknown:
+            fail(f"program {key!r} has unknown fields: {', '.join(unknown)}")
+        if key in programs:
+            fail(f"duplicate program key {key!r}")
+        name = entry.get("name")
+        if not isinstance(name, str) or not name.strip() or name in names:
+            fail(f"program {key!r} needs a unique name")
+        group = entry.get("group", "other")
+        if not isinstance(group, str) or not CATALOG_KEY_RE.match(group):
+            fail(f"program {key!r} has an invalid group")
+        requires = entry.get("requires", [])
+        if not isinstance(requires, list) or (requires and not _is_string_list(requires)):
+            fail(f"requires of program {key!r} must be a list of program keys")
+        if not isinstance(entry.get("packages"), list) or not entry["packages"]:
+            fail(f"program {key!r} needs at least one package")
+        packages = []
+        for package in entry["packages"]:
+            package_id = package.get("id") if isinstance(package, dict) else None
+            if not isinstance(package_id, str) or not package_id or package_id.split() != [package_id]:
+                fail(f"every package of program {key!r} needs an id without spaces")
+            unknown = sorted(set(package) - set(CATALOG_PACKAGE_FIELDS))
+            if unknown:
+                fail(f"package {package_id} has unknown fields: {', '.join(unknown)}")
+            if package_id.lower() in package_ids:
+                fail(f"package {package_id} is listed twice")
+            package_ids.add(package_id.lower())
+            arch = package.get("arch")
+            if arch is not None and arch not in CATALOG_ARCHITECTURES:
+                fail(f"package {package_id} has arch {arch!r}, expected one of {', '.join(CATALOG_ARCHITECTURES)}")
+            args = package.get("args", default_args)
+            if not isinstance(args, list) or (args and not _is_string_list(args)):
+                fail(f"args of package {package_id} must be a list of strings")
+            runtime = package.get("runtime")
+            if runtime is not None and (not isinstance(runtime, str) or not CATALOG_KEY_RE.match(runtime)):
+                fail(f"package {package_id} has an invalid runtime")
+            if runtime is not None and arch is None:
+                fail(f"package {package_id} names a runtime but no arch")
+            min_version = package.get("min_version")
+            if min_version is not None and (
+                runtime is None or not isinstance(min_version, str) or not CATALOG_VERSION_RE.match(min_version)
+            ):
+                fail(f"package {package_id} needs a runtime and a dotted min_version")
+            tail = ("--id", package_id, "--exact") + tuple(args) + WINGET_AGREEMENT_FLAGS
+            packages.append(CatalogPackage(
+                package_id, arch, runtime, min_version, ("winget", "install") + tail, ("winget", "upgrade") + tail, None
+            ))
+        names.add(name)
+        programs[key] = CatalogProgram(key, name, group, tuple(requires), tuple(packages))
+    clashing = sorted({program.group for program in programs.values()} & set(programs))
+    if clashing:
+        fail(f"group names clash with program keys: {', '.join(clashing)}")
+
+    ordered = []
+    visiting = []
+
+    def visit(key):
+        if programs[key] in ordered:
+            return
+        if key in visiting:
+            fail("circular requires: " + " -> ".join(visiting[visiting.index(key):] + [key]))
+        visiting.append(key)
+        for required in programs[key].requires:
+            if required not in programs:
+                fail(f"program {key!r} requires unknown program {required!r}")
+            visit(required)
+        visiting.pop()
+        ordered.append(programs[key])
+
+    for key in programs:
+        visit(key)
+    return tuple(ordered)
+
+
+@lru_cache(maxsize=None)
+def load_catalog(path: str) -> tuple:
+    """Read and compile a catalog file; each file is compiled once per process. Raises ValueError if invalid."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except OSError as e:
+        raise ValueError(f"Cannot read catalog {path}: {e}") from e
+    except ValueError as e:
+        raise ValueError(f"{path} is not valid JSON: {e}") from e
+    return compile_catalog(data, path)
+
+
+def catalog_path(options: dict = None) -> str:
+    """The catalog to use: --catalog, a catalog.json next to the installer, or the one bundled with it."""
+    if options and options.get("catalog"):
+        return options["catalog"]
+    beside = os.path.join(os.path.dirname(installer_path()), CATALOG_FILE)
+    if os.path.isfile(beside):
+        return beside
+    return os.path.join(getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__))), CATALOG_FILE)
+
+
+def select_programs(programs: tuple, only: str = None, skip: str = None) -> tuple:
+    """
+    Apply --only and --skip (comma-separated program keys or group names) to a compiled catalog.
+
+    Programs required by a selected one are selected too, unless they are skipped.
+    Raises ValueError for names the catalog does not know.
+    """
+    keys = {program.key: program for program in programs}
+    groups = {program.group for program in programs}
+
+    def expand(value, option):
+        selected = set()
+        for name in filter(None, (part.strip().lower() for part in (value or "").split(","))):
+            if name in keys:
+                selected.add(name)
+            elif name in groups:
+                selected.update(program.key for program in programs if program.group == name)
+            else:
+                raise ValueError(
+                    f"{option}: unknown program {name!r} (programs: {', '.join(keys)}; groups: {', '.join(sorted(groups))})"
+                )
+        return selected
+
+    selected = expand(only, "--only") if only else set(keys)
+    pending = list(selected)
+    while pending:
+        for required in keys[pending.pop()].requires:
+            if required not in selected:
+                selected.add(required)
+                pending.append(required)
+    selected -= expand(skip, "--skip")
+    return tuple(program for program in programs if program.key in selected)
+
+
+def build_program_list(options: dict = None) -> tuple:
+    """Return the catalog programs selected by options (--catalog, --only, --skip); shared by GUI and silent mode."""
+    options = options or {}
+    return select_programs(load_catalog(catalog_path(options)), options.get("only"), options.get("skip"))
+
+
+# ----------------------------- INSTALLED PACKAGE INDEX -----------------------------
+
+WINGET_SOURCES = ("winget", "msstore")
+
+
+def parse_winget_table(text: str) -> list:
+    """
+    Split a winget table (list/upgrade output) into rows of column strings.
+
+    Column boundaries are taken from the header line above the dashed separator,
+    so names containing spaces stay intact and localized headers do not matter.
+    """
+    lines = text.replace("\r", "\n").splitlines()
+    for sep_index, line in enumerate(lines):
+        if sep_index > 0 and line.strip() and set(line.strip()) == {"-"}:
+            break
+    else:
+        return []
+    header = lines[sep_index - 1]
+    starts = [m.start() for m in re.finditer(r"(?:(?<=\s)|^)\S", header)]
+    rows = []
+    for line in lines[sep_index + 1:]:
+        if not line.strip():
+            continue
+        bounds = starts + [len(line)]
+        rows.append([line[bounds[k]:bounds[k + 1]].strip() for k in range(len(starts))])
+    return rows
+
+
+def build_installed_index(text: str) -> dict:
+    """Map lower-case package ID to {"version", "available"} from 'winget list' output."""
+    rows = [row for row in parse_winget_table(text) if len(row) >= 3]
+    if not rows:
+        return {}
+    has_source = all(row[-1] in WINGET_SOURCES + ("",) for row in rows)
+    columns = len(rows[0]) - (1 if has_source else 0)
+    index = {}
+    for row in rows:
+        available = row[3] if columns >= 4 else ""
+        index[row[1].lower()] = {"version": row[2], "available": available}
+    return index
+
+
+def lookup_installed(index: dict, package_id: str):
+    """Find package_id in the index, tolerating IDs that winget truncated with an ellipsis."""
+    key = package_id.lower()
+    if key in index:
+        return index[key]
+    for indexed_id, entry in index.items():
+        if indexed_id.endswith("…") and key.startswith(indexed_id[:-1]):
+            return entry
+    return None
+
+
+async def load_installed_index_async(tracer=None, supervisor=None):
+    """Run 'winget list' once and return the installed package index, or None if it failed."""
+    try:
+        out, _, code = await run_command_async(
+            ["winget", "list", *WINGET_AGREEMENT_FLAGS], tracer=tracer, span="winget list", tail_lines=None,
+            supervisor=supervisor
+        )
+    except CommandTimeout:
+        return None
+    if code != 0:
+        return None
+    return build_installed_index(out)
+
+
+# ----------------------------- WINGET SELF-UPDATE CHECK -----------------------------
+
+WINGET_SELF_ID = "Microsoft.Winget"
+WINGET_CHECK_FILE = "universal_runtime_winget_check.json"
+DEFAULT_WINGET_CHECK_TTL_HOURS = 24
+
+
+def winget_available() -> bool:
+    """Tell whether winget is on PATH without starting a process."""
+    return shutil.which("winget") is not None
+
+
+class WingetSelfCheck:
+    """
+    winget version and self-update check that runs next to the first installs.
+
+    The check lists pending upgrades ('winget upgrade' without arguments, which
+    installs nothing) and only applies the winget update when one is listed. The
+    scheduler runs its winget commands inside using_winget(), so they are held back
+    only in that case and the update never replaces winget under a running command.
+    A result younger than ttl_hours is reused without starting any process. The check
+    runs as a task on the scheduler's event loop.
+    """
+
+    def __init__(self, cache_path: str, ttl_hours: float = DEFAULT_WINGET_CHECK_TTL_HOURS, on_event=None,
+                 tracer=None, supervisor=None):
+        self.cache_path = cache_path
+        self.ttl_hours = ttl_hours
+        self.on_event = on_event or (lambda kind, **data: None)
+        self.tracer = tracer
+        self.supervisor = supervisor
+        self.done = threading.Event()
+        self.updating = threading.Event()
+        self.version = ""
+        self._task = None
+        self._gate = None
+        self._users = 0
+
+    def _load_cached(self):
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            if time.time() - cached["checked_at"] <= self.ttl_hours * 3600:
+                return cached
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def start(self):
+        """Reuse a fresh cached result or start the check as a task on the running event loop."""
+        if self._task or self.done.is_set():
+            return
+        cached = self._load_cached()
+        if cached:
+            self.version = cached["version"]
+            self.on_event("winget_check_cached", version=cached["version"])
+            self.done.set()
+            return
+        self._gate = asyncio.Condition()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        try:
+            self.on_event("checking_winget_updates")
+            out, _, code = await run_command_async(
+                "winget --version", tracer=self.tracer, span="winget --version", supervisor=self.supervisor
+            )
+            version = self.version = out.strip() if code == 0 else ""
+            self.on_event("winget_version", version=version)
+            out, _, code = await run_command_async(
+                ["winget", "upgrade", *WINGET_AGREEMENT_FLAGS], tracer=self.tracer, span="winget upgrade list",
+                tail_lines=None, supervisor=self.supervisor
+            )
+            entry = lookup_installed(build_installed_index(out), WINGET_SELF_ID) if code == 0 else None
+            if entry and entry["available"]:
+                async with self._gate:
+                    self.updating.set()
+                    # New commands now wait in using_winget(); the update waits for the running ones.
+                    await self._gate.wait_for(lambda: self._users == 0)
+                self.on_event("winget_updating", version=entry["available"])
+                out, err, _ = await run_command_async(
+                    ["winget", "upgrade", "--id", WINGET_SELF_ID, *WINGET_AGREEMENT_FLAGS],
+                    tracer=self.tracer, span="winget self-update", supervisor=self.supervisor
+                )
+                self.on_event("winget_update_output", output=out.strip() or err.strip())
+                version = self.version = entry["available"]
+            else:
+                self.on_event("winget_up_to_date")
+            try:
+                with open(self.cache_path, "w", encoding="utf-8") as f:
+                    json.dump({"checked_at": time.time(), "version": version}, f)
+            except OSError as e:
+                print("Failed to cache winget check:", e)
+        except (CommandTimeout, RunAborted) as e:
+            # Not cached, so the next run checks again.
+            print("winget check stopped:", e)
+        finally:
+            async with self._gate:
+                self.done.set()
+                self._gate.notify_all()
+
+    @asynccontextmanager
+    async def using_winget(self):
+        """
+        Hold while running a winget command. Commands share the gate with each other;
+        once an update is due they wait until it has been applied.
+        """
+        if self._gate is None:
+            # No check running, nothing to keep apart.
+            yield
+            return
+        async with self._gate:
+            await self._gate.wait_for(lambda: not self.updating.is_set() or self.done.is_set())
+            self._users += 1
+        try:
+            yield
+        finally:
+            async with self._gate:
+                self._users -= 1
+                self._gate.notify_all()
+
+    async def wait(self):
+        if self._task:
+            await self._task
+
+
+# ----------------------------- WINGET WORKER SESSION -----------------------------
+
+# PowerShell host answering one JSON request per line with the WinGet client module, so
+# sources and the package index are loaded once per run instead of once per command.
+WINGET_WORKER_SCRIPT = r"""
+$ErrorActionPreference = 'Stop'
+$ProgressPreference = 'SilentlyContinue'
+Import-Module Microsoft.WinGet.Client
+[Console]::Out.WriteLine('{"ready": true}')
+while ($null -ne ($line = [Console]::In.ReadLine())) {
+    $req = $line | ConvertFrom-Json
+    try {
+        if ($req.op -eq 'list') {
+            $rows = @(Get-WinGetPackage | ForEach-Object {
+                $available = if ($_.IsUpdateAvailable) { [string]$_.AvailableVersions[0] } else { '' }
+                @{ id = $_.Id; version = [string]$_.InstalledVersion; available = $available }
+            })
+            $res = @{ id = $req.id; code = 0; packages = $rows }
+        } else {
+            $params = @{ Id = $req.package; MatchOption = 'Equals'; Mode = 'Silent' }
+            if ($req.version) { $params.Version = $req.version }
+            if ($req.force) { $params.Force = $true }
+            if ($req.interactive) { $params.Mode = 'Interactive' }
+            if ($req.scope) { $params.Scope = if ($req.scope -eq 'user') { 'User' } else { 'System' } }
+            if ($req.architecture) { $params.Architecture = $req.architecture }
+            foreach ($name in 'override', 'custom', 'location', 'source', 'locale') {
+                if ($req.$name) { $params[$name] = $req.$name }
+            }
+            $r = if ($req.op -eq 'install') { Install-WinGetPackage @params } else { Update-WinGetPackage @params }
+            $code = if ($r.Status -ne 'Ok') { if ($r.ExtendedErrorCode) { $r.ExtendedErrorCode.HResult } else { 1 } }
+                    elseif ($r.RebootRequired) { 0x8A150109 } else { 0 }
+            $res = @{ id = $req.id; code = $code; output = "$($r.Status) $($r.InstallerErrorCode)".Trim() }
+        }
+    } catch {
+        $code = if ($_.Exception.HResult) { $_.Exception.HResult } else { 1 }
+        $res = @{ id = $req.id; code = $code; output = "$_" }
+    }
+    [Console]::Out.WriteLine(($res | ConvertTo-Json -Compress -Depth 4))
+}
+"""
+
+WORKER_START_TIMEOUT = 120
+
+# winget options the worker passes on to Install-/Update-WinGetPackage: option -> (request field, takes a value).
+SESSION_OPTIONS = {
+    "--version": ("version", True), "-v": ("version", True),
+    "--force": ("force", False),
+    "--interactive": ("interactive", False), "-i": ("interactive", False),
+    "--scope": ("scope", True),
+    "--architecture": ("architecture", True), "-a": ("architecture", True),
+    "--override": ("override", True),
+    "--custom": ("custom", True),
+    "--location": ("location", True), "-l": ("location", True),
+    "--source": ("source", True), "-s": ("source", True),
+    "--locale": ("locale", True),
+}
+# Update-WinGetPackage has no -Scope or -Architecture.
+SESSION_INSTALL_ONLY_OPTIONS = {"--scope", "--architecture", "-a"}
+# What the worker always does: match the ID exactly, run silently and never prompt.
+SESSION_IMPLIED_OPTIONS = {
+    "--exact", "-e", "--silent", "-h", "--disable-interactivity",
+    "--accept-source-agreements", "--accept-package-agreements",
+}
+
+
+def session_request(command):
+    """
+    Translate a 'winget install/upgrade <id> ...' command into a worker request (op, fields).
+
+    Returns None when the command has an option the worker cannot pass on, so that it
+    runs as a winget process instead of losing the option.
+    """
+    parts = command.split() if isinstance(command, str) else list(command)
+    if parts[:1] != ["winget"] or parts[1:2] not in (["install"], ["upgrade"]):
+        return None
+    op = parts[1]
+    fields = {"package": None, "version": None, "force": False}
+    rest = parts[2:]
+    i = 0
+    while i < len(rest):
+        part = rest[i]
+        if part in ("--id", "--query", "-q") and i + 1 < len(rest) and fields["package"] is None:
+            fields["package"] = rest[i + 1]
+            i += 2
+        elif not part.startswith("-") and fields["package"] is None:
+            fields["package"] = part
+            i += 1
+        elif part in SESSION_IMPLIED_OPTIONS:
+            i += 1
+        elif part in SESSION_OPTIONS and (op == "install" or part not in SESSION_INSTALL_ONLY_OPTIONS):
+            field, takes_value = SESSION_OPTIONS[part]
+            if takes_value and i + 1 >= len(rest):
+                return None
+            fields[field] = rest[i + 1] if takes_value else True
+            i += 2 if takes_value else 1
+        else:
+            return None
+    return (op, fields) if fields["package"] else None
+
+
+def default_worker_argv() -> list:
+    encoded = base64.b64encode(WINGET_WORKER_SCRIPT.encode("utf-16-le")).decode("ascii")
+    return ["powershell", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-EncodedCommand", encoded]
+
+
+class WorkerCrashed(Exception):
+    """The worker process exited or closed its output."""
+
+
+class WingetSession:
+    """
+    A long-lived winget worker that install, upgrade and list requests are sent to.
+
+    Protocol: the worker prints {"ready": true} once it is set up, then reads one JSON
+    request per line ({"id", "op": "install" | "upgrade" | "list", "package", "version",
+    "force"} plus the other options of SESSION_OPTIONS that the command sets) and
+    answers with one JSON line carrying the same id, an exit "code" and
+    "output" (or "packages" for list). Lines {"id", "progress": percent} may come first;
+    anything that is not JSON is ignored. argv selects the worker, so a local stand-in
+    can replace the PowerShell host. A worker that dies is restarted and the request
+    sent again once; if it cannot be (re)started or dies again, usable turns False and
+    callers fall back to one winget process per command.
+    """
+
+    def __init__(self, argv: list = None, supervisor=None):
+        self.argv = argv or default_worker_argv()
+        self.supervisor = supervisor
+        self.usable = True
+        self.proc = None
+        self._lines = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _start(self):
+        self.proc = subprocess.Popen(
+            self.argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            start_new_session=os.name != "nt"
+        )
+        self._lines = queue.Queue()
+
+        def reader(stream, lines):
+            for raw in stream:
+                lines.put(raw.decode("utf-8", errors="replace").strip())
+            lines.put(None)
+
+        threading.Thread(target=reader, args=(self.proc.stdout, self._lines), daemon=True).start()
+        self._read(lambda msg: msg.get("ready"), "worker start", WORKER_START_TIMEOUT)
+
+    def _read(self, matches, command: str, timeout: float = None, on_progress=None) -> dict:
+        """Return the next message accepted by matches, enforcing timeouts and cancellation."""
+        started = time.monotonic()
+        while True:
+            try:
+                line = self._lines.get(timeout=SUPERVISOR_POLL_INTERVAL)
+            except queue.Empty:
+                if self.proc.poll() is not None:
+                    raise WorkerCrashed(f"worker exited with code {self.proc.returncode}")
+                try:
+                    if self.supervisor:
+                        self.supervisor.check()
+                except RunAborted:
+                    self.close(kill=True)
+                    raise
+                limit = timeout or (self.supervisor.command_timeout if self.supervisor else None)
+                if limit and time.monotonic() - started >= limit:
+                    self.close(kill=True)
+                    raise CommandTimeout(command, limit)
+                continue
+            if line is None:
+                raise WorkerCrashed("worker closed its output")
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(msg, dict):
+                continue
+            if "progress" in msg:
+                # Progress is never the answer, whether or not the caller follows it.
+                if on_progress:
+                    on_progress(msg["progress"])
+            elif matches(msg):
+                return msg
+
+    def request(self, op: str, command: str = None, on_progress=None, **fields) -> dict:
+        """Send one request and return the worker's answer (with "code" set)."""
+        with self._lock:
+            for attempt in range(2):
+                starting = False
+                try:
+                    if self.proc is None or self.proc.poll() is not None:
+                        starting = True
+                        self._start()
+                    self._next_id += 1
+                    request_id = self._next_id
+                    self.proc.stdin.write((json.dumps(dict(fields, id=request_id, op=op)) + "\n").encode("utf-8"))
+                    self.proc.stdin.flush()
+                    return self._read(lambda msg: msg.get("id") == request_id, command or op, on_progress=on_progress)
+                except (WorkerCrashed, OSError) as e:
+                    print("winget worker failed:", e)
+                    self.close(kill=True)
+                    if starting:
+                        break
+            # A worker that cannot be (re)started, or crashes again right away, would fail every
+            # remaining package the same way: callers fall back to winget processes from now on.
+            self.usable = False
+            return {"code": 1, "output": "winget worker crashed"}
+
+    @staticmethod
+    def handles(command) -> bool:
+        """Tell whether a command is a 'winget install/upgrade <id>' the worker can run with all its options."""
+        return session_request(command) is not None
+
+    def run_command(self, command, on_progress=None):
+        """Run a catalog style winget command in the worker, returning (stdout, stderr, returncode)."""
+        parts = command.split() if isinstance(command, str) else list(command)
+        op, fields = session_request(parts)
+        reply = self.request(op, subprocess.list2cmdline(parts), on_progress=on_progress, **fields)
+        return str(reply.get("output", "")), "", int(reply.get("code", 1))
+
+    def installed_index(self):
+        """Installed package index in the format of build_installed_index(), or None."""
+        reply = self.request("list", "winget list")
+        if reply.get("code") != 0 or "packages" not in reply:
+            return None
+        return {
+            row["id"].lower(): {"version": row.get("version", ""), "available": row.get("available", "")}
+            for row in reply["packages"]
+        }
+
+    def close(self, kill: bool = False):
+        """End the worker: closing its input lets it exit, kill stops its process tree at once."""
+        if self.proc is None:
+            return
+        if not kill:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        if self.proc.poll() is None:
+            kill_process_tree(self.proc)
+        self.proc = None
+
+
+# ----------------------------- PAYLOAD CACHE -----------------------------
+
+DEFAULT_CACHE_MAX_MB = 4096
+
+
+def unique_tmp_path(path: str) -> str:
+    """Temporary name next to path; unique across threads, processes and hosts sharing a folder."""
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PayloadCache:
+    """
+    Content-addressed store of downloaded installers, keyed by package ID, version and SHA-256.
+
+    Payloads live in '<root>/<sha256>/<installer file name>' and are described by
+    '<root>/index.json'. The root may be a local folder, a network share or a USB
+    drive; entries are hash-checked before use and the least recently used ones are
+    evicted once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, "index.json")
+        self._lock = threading.Lock()
+        self.session_start = time.time()
+        os.makedirs(root, exist_ok=True)
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _save(self):
+        tmp_path = unique_tmp_path(self.index_path)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry:
+            shutil.rmtree(os.path.join(self.root, entry["sha256"]), ignore_errors=True)
+
+    def lookup(self, package_id: str, version: str = None):
+        """
+        Return the cached payload for package_id (the newest stored one unless version is given).
+
+        Returns None on a miss; an entry whose file no longer matches its hash is dropped
+        and reported by raising ValueError so the caller can download it again.
+        """
+        with self._lock:
+            candidates = [
+                (key, entry) for key, entry in self.entries.items()
+                if entry["id"].lower() == package_id.lower() and (not version or entry["version"] == version)
+            ]
+            if not candidates:
+                return None
+            key, entry = max(candidates, key=lambda item: item[1]["stored_at"])
+            # Marked as used by this session before unlocking, so no concurrent store() evicts it.
+            entry["last_used"] = time.time()
+        path = os.path.join(self.root, entry["sha256"], entry["file"])
+        # Hashing runs unlocked: the download workers check their payloads in parallel.
+        intact = os.path.isfile(path) and file_sha256(path) == entry["sha256"]
+        with self._lock:
+            if not intact:
+                if self.entries.get(key) is entry:
+                    self._remove(key)
+                try:
+                    self._save()
+                except OSError:
+                    pass
+                raise ValueError(f"cached payload of {package_id} {entry['version']} failed the hash check")
+            try:
+                self._save()
+            except OSError:
+                # A read-only share (e.g. one shared by a fleet) still serves payloads.
+                pass
+            return {
+                "path": path,
+                "type": entry["type"],
+                "switches": entry["switches"],
+                "version": entry["version"],
+                "sha256": entry["sha256"],
+            }
+
+    def cached_size(self, package_id: str, version: str = None):
+        """Size of the payload lookup() would return, or None; the file is not hash-checked."""
+        with self._lock:
+            candidates = [
+                entry for entry in self.entries.values()
+                if entry["id"].lower() == package_id.lower() and (not version or entry["version"] == version)
+            ]
+            if not candidates:
+                return None
+            entry = max(candidates, key=lambda entry: entry["stored_at"])
+            if not os.path.isfile(os.path.join(self.root, entry["sha256"], entry["file"])):
+                return None
+            return entry["size"]
+
+    def store(self, package_id: str, payload: dict):
+        """
+        Copy a freshly downloaded payload into the cache and return the cached payload.
+
+        Returns None if the download does not match the hash declared in its manifest.
+        """
+        sha256 = file_sha256(payload["path"])
+        if payload.get("sha256") and payload["sha256"] != sha256:
+            return None
+        name = os.path.basename(payload["path"])
+        blob_dir = os.path.join(self.root, sha256)
+        blob_path = os.path.join(blob_dir, name)
+        if not os.path.isfile(blob_path):
+            os.makedirs(blob_dir, exist_ok=True)
+            tmp_path = unique_tmp_path(blob_path)
+            shutil.copyfile(payload["path"], tmp_path)
+            os.replace(tmp_path, blob_path)
+        now = time.time()
+        key = f"{package_id}|{payload.get('version', '')}|{sha256}"
+        with self._lock:
+            self.entries[key] = {
+                "id": package_id,
+                "version": payload.get("version", ""),
+                "sha256": sha256,
+                "file": name,
+                "type": payload.get("type", ""),
+                "switches": payload.get("switches", ""),
+                "size": os.path.getsize(blob_path),
+                "stored_at": now,
+                "last_used": now,
+            }
+            self._evict()
+            self._save()
+        return dict(payload, path=blob_path, sha256=sha256)
+
+    def _evict(self):
+        """
+        Drop least recently used entries until the cache fits.
+
+        Entries used by this session are kept, since their payloads may still be waiting
+        in the install lane; the cache can therefore exceed its limit during one run.
+        """
+        total = sum(entry["size"] for entry in self.entries.values())
+        for key, entry in sorted(self.entries.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes or entry["last_used"] >= self.session_start:
+                break
+            total -= entry["size"]
+            self._remove(key)
+
+
+# ----------------------------- CHECKPOINT JOURNAL -----------------------------
+
+JOURNAL_FILE = "install_journal.json"
+DEFAULT_JOURNAL_MAX_AGE_HOURS = 24
+
+# Outcomes that count as done when a run is resumed.
+JOURNAL_SUCCESS_OUTCOMES = ("installed", "upgraded", "already_installed", "imported")
+
+
+class InstallJournal:
+    """
+    Crash-safe record of completed commands, kept in the work directory.
+
+    Every record rewrites the journal through a temporary file that is fsynced and
+    then renamed over the old one, so a reboot or power loss leaves either the old
+    or the new journal behind, never a torn one. Journals older than max_age_hours
+    are discarded when loaded.
+    """
+
+    def __init__(self, path: str, max_age_hours: float = DEFAULT_JOURNAL_MAX_AGE_HOURS):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {"started": time.time(), "records": {}}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if time.time() - data["started"] <= max_age_hours * 3600:
+                self.data = data
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def record(self, package_id: str, outcome: str, version: str = ""):
+        with self._lock:
+            self.data["records"][package_id.lower()] = {
+                "package": package_id,
+                "version": version,
+                "outcome": outcome,
+                "time": time.time(),
+            }
+            try:
+                self._save()
+            except OSError as e:
+                print("Failed to write install journal:", e)
+
+    def succeeded(self, package_id: str) -> bool:
+        entry = self.data["records"].get(package_id.lower())
+        return bool(entry) and entry["outcome"] in JOURNAL_SUCCESS_OUTCOMES
+
+    def reset(self):
+        """Start a new journal (used by runs that do not resume)."""
+        with self._lock:
+            self.data = {"started": time.time(), "records": {}}
+            try:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+            except OSError as e:
+                print("Failed to remove install journal:", e)
+
+
+# ----------------------------- RUN HISTORY -----------------------------
+
+HISTORY_FILE = "universal_runtime_history.sqlite3"
+
+# Outcomes whose durations are representative of a real install.
+HISTORY_TIMED_OUTCOMES = ("installed", "upgraded")
+
+# A package is flagged when its latest duration exceeds this multiple of its earlier median,
+# given at least REGRESSION_MIN_SAMPLES earlier runs.
+REGRESSION_FACTOR = 2.0
+REGRESSION_MIN_SAMPLES = 3
+
+# Expected duration of a package without history (seconds).
+DEFAULT_PACKAGE_SECONDS = 60.0
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    status TEXT,
+    winget_version TEXT
+);
+CREATE TABLE IF NOT EXISTS packages (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    package_id TEXT NOT NULL,
+    program TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    duration REAL NOT NULL,
+    bytes INTEGER NOT NULL,
+    exit_code INTEGER,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS packages_by_id ON packages(package_id, finished_at);
+"""
+
+
+def percentile(values: list, q: float) -> float:
+    """Linearly interpolated q-th percentile (0-100) of a non-empty list."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class RunHistory:
+    """
+    SQLite record of every run and of each package it installed.
+
+    Rows are written as soon as a package finishes, so interrupted runs keep their
+    data. A connection is opened per call because the GUI, silent mode and the
+    report access the database from different threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.run_id = None
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.executescript(HISTORY_SCHEMA)
+        return connection
+
+    def start_run(self):
+        try:
+            with closing(self._connect()) as db, db:
+                self.run_id = db.execute("INSERT INTO runs (started_at) VALUES (?)", (time.time(),)).lastrowid
+        except sqlite3.Error as e:
+            print("Run history unavailable:", e)
+            self.run_id = None
+
+    def record_package(self, package_id: str, program: str, outcome: str, duration: float, size: int, exit_code):
+        if self.run_id is None:
+            return
+        try:
+            with closing(self._connect()) as db, db:
+                db.execute(
+                    "INSERT INTO packages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.run_id, package_id.lower(), program, outcome, duration, size, exit_code, time.time())
+                )
+        except sqlite3.Error as e:
+            print("Failed to write run history:", e)
+
+    def finish_run(self, status: str, winget_version: str = ""):
+        if self.run_id is None:
+            return
+        try:
+            with closing(self._connect()) as db, db:
+                db.execute(
+                    "UPDATE runs SET finished_at = ?, status = ?, winget_version = ? WHERE id = ?",
+                    (time.time(), status, winget_version, self.run_id)
+                )
+        except sqlite3.Error as e:
+            print("Failed to write run history:", e)
+
+    def durations(self) -> dict:
+        """Return {package_id: [durations, oldest first]} of representative installs."""
+        durations = {}
+        try:
+            with closing(self._connect()) as db:
+                rows = db.execute(
+                    "SELECT package_id, duration FROM packages WHERE outcome IN (?, ?) ORDER BY finished_at",
+                    HISTORY_TIMED_OUTCOMES
+                ).fetchall()
+        except sqlite3.Error as e:
+            print("Run history unavailable:", e)
+            return durations
+        for package_id, duration in rows:
+            durations.setdefault(package_id, []).append(duration)
+        return durations
+
+    def expected_durations(self) -> dict:
+        """Median install duration per package, used for the ETA."""
+        return {package_id: percentile(values, 50) for package_id, values in self.durations().items()}
+
+    def expected_sizes(self) -> dict:
+        """Median downloaded size per package, used for the plan preview."""
+        sizes = {}
+        try:
+            with closing(self._connect()) as db:
+                rows = db.execute("SELECT package_id, bytes FROM packages WHERE bytes > 0").fetchall()
+        except sqlite3.Error as e:
+            print("Run history unavailable:", e)
+            return sizes
+        for package_id, size in rows:
+            sizes.setdefault(package_id, []).append(size)
+        return {package_id: percentile(values, 50) for package_id, values in sizes.items()}
+
+    def report(self) -> list:
+        """
+        Per-package statistics: runs, p50/p90/max duration, the latest duration and
+        whether it is a regression against the median of the earlier runs.
+        """
+        rows = []
+        for package_id, values in sorted(self.durations().items()):
+            earlier = values[:-1]
+            baseline = percentile(earlier, 50) if earlier else None
+            rows.append({
+                "package": package_id,
+                "runs": len(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "max": max(values),
+                "latest": values[-1],
+                "baseline": baseline,
+                "regression": len(earlier) >= REGRESSION_MIN_SAMPLES and values[-1] > REGRESSION_FACTOR * baseline,
+            })
+        return rows
+
+
+def format_history_report(rows: list) -> str:
+    """Render RunHistory.report() as a text table."""
+    if not rows:
+        return "No run history recorded yet."
+    width = max(len("Package"), *(len(row["package"]) for row in rows))
+    lines = [f"{'Package':<{width}}  {'Runs':>4}  {'p50 s':>7}  {'p90 s':>7}  {'max s':>7}  {'latest s':>8}"]
+    for row in rows:
+        line = (f"{row['package']:<{width}}  {row['runs']:>4}  {row['p50']:>7.1f}  {row['p90']:>7.1f}  "
+                f"{row['max']:>7.1f}  {row['latest']:>8.1f}")
+        if row["regression"]:
+            line += f"  REGRESSION ({row['latest'] / row['baseline']:.1f}x median)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# ----------------------------- EXIT CODE CLASSIFICATION -----------------------------
+
+# What to do after a result: accept it, try 'winget upgrade' instead, run the same
+# command again after a pause, or give up.
+ACTION_DONE = "done"
+ACTION_UPGRADE = "upgrade"
+ACTION_RETRY = "retry"
+ACTION_FAIL = "fail"
+
+# Exit codes of winget (HRESULTs, as unsigned 32-bit values) and of Windows Installer /
+# directly launched installers, mapped to (outcome, action). The outcome names the result
+# independently of the system language.
+EXIT_CODE_RESULTS = {
+    0: ("success", ACTION_DONE),
+    1641: ("reboot_required", ACTION_DONE),  # ERROR_SUCCESS_REBOOT_INITIATED
+    3010: ("reboot_required", ACTION_DONE),  # ERROR_SUCCESS_REBOOT_REQUIRED
+    1618: ("installer_busy", ACTION_RETRY),  # ERROR_INSTALL_ALREADY_RUNNING
+    1638: ("already_installed", ACTION_UPGRADE),  # ERROR_PRODUCT_VERSION
+    0x8A150008: ("network", ACTION_RETRY),  # DOWNLOAD_FAILED
+    0x8A150011: ("hash_mismatch", ACTION_FAIL),  # INSTALLER_HASH_MISMATCH
+    0x8A150014: ("not_found", ACTION_FAIL),  # NO_APPLICATIONS_FOUND
+    0x8A15002B: ("no_update", ACTION_DONE),  # UPDATE_NOT_APPLICABLE
+    0x8A150061: ("already_installed", ACTION_UPGRADE),  # PACKAGE_ALREADY_INSTALLED
+    0x8A150101: ("in_use", ACTION_RETRY),  # INSTALL_PACKAGE_IN_USE
+    0x8A150102: ("installer_busy", ACTION_RETRY),  # INSTALL_INSTALL_IN_PROGRESS
+    0x8A150103: ("in_use", ACTION_RETRY),  # INSTALL_FILE_IN_USE
+    0x8A150105: ("disk_full", ACTION_FAIL),  # INSTALL_DISK_FULL
+    0x8A150107: ("network", ACTION_RETRY),  # INSTALL_NO_NETWORK
+    0x8A150109: ("reboot_required", ACTION_DONE),  # INSTALL_REBOOT_REQUIRED_TO_FINISH
+    0x8A15010A: ("reboot_pending", ACTION_FAIL),  # INSTALL_REBOOT_REQUIRED_FOR_INSTALL
+    0x8A15010B: ("reboot_required", ACTION_DONE),  # INSTALL_REBOOT_INITIATED
+    0x8A15010C: ("cancelled_by_user", ACTION_FAIL),  # INSTALL_CANCELLED_BY_USER
+    0x8A15010D: ("already_installed", ACTION_DONE),  # INSTALL_ALREADY_INSTALLED
+    0x8A15010E: ("no_update", ACTION_DONE),  # INSTALL_DOWNGRADE (a newer version is installed)
+    0x8A15010F: ("blocked", ACTION_FAIL),  # INSTALL_BLOCKED_BY_POLICY
+}
+
+# Retries for ACTION_RETRY results, waiting RETRY_BACKOFF * 3**attempt seconds before each.
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 2.0
+
+
+def classify_exit_code(code: int):
+    """Return (outcome, action) for an exit code; unknown failures are given up on."""
+    # Depending on the Python build, HRESULTs can arrive as negative numbers.
+    return EXIT_CODE_RESULTS.get(code & 0xFFFFFFFF, ("failed", ACTION_FAIL))
+
+
+def format_exit_code(code: int) -> str:
+    code &= 0xFFFFFFFF
+    return f"0x{code:08X}" if code > 0xFFFF else str(code)
+
+
+# ----------------------------- SYSTEM DETECTION -----------------------------
+
+# Registry keys of the Visual C++ runtimes by catalog runtime family ({arch}: x64, x86, arm64).
+VC_RUNTIME_KEYS = {
+    "vc10": r"SOFTWARE\Microsoft\VisualStudio\10.0\VC\VCRedist\{arch}",
+    "vc11": r"SOFTWARE\Microsoft\VisualStudio\11.0\VC\Runtimes\{arch}",
+    "vc12": r"SOFTWARE\Microsoft\VisualStudio\12.0\VC\Runtimes\{arch}",
+    "vc14": r"SOFTWARE\Microsoft\VisualStudio\14.0\VC\Runtimes\{arch}",
+}
+
+# Catalog architecture by PROCESSOR_ARCHITECTURE.
+PROCESSOR_ARCHITECTURES = {"AMD64": "x64", "X86": "x86", "ARM64": "arm64"}
+
+# First Windows build that runs x64 programs on ARM64 (Windows 11).
+ARM64_X64_EMULATION_BUILD = 22000
+
+
+def version_key(version: str) -> tuple:
+    """Comparable form of a dotted version such as 'v14.40.33810.00'."""
+    return tuple(int(part) for part in re.findall(r"\d+", version or ""))
+
+
+class SystemProvider:
+    """
+    What the planning stage knows about the system it installs on.
+
+    architectures() returns the installer architectures that can run here, or None
+    if unknown (nothing is then pruned by architecture); installed_runtimes() returns
+    {(runtime, arch): version} of the runtimes found, including those installed by
+    other setups that winget does not list. This base class knows nothing.
+    """
+
+    def architectures(self):
+        return None
+
+    def installed_runtimes(self) -> dict:
+        return {}
+
+
+class WindowsSystemProvider(SystemProvider):
+    """Detects the OS architecture from the environment and the VC++ runtimes from the registry."""
+
+    def architectures(self):
+        # PROCESSOR_ARCHITEW6432 holds the real architecture when 32-bit Python runs on a 64-bit OS.
+        machine = os.environ.get("PROCESSOR_ARCHITEW6432") or os.environ.get("PROCESSOR_ARCHITECTURE", "")
+        native = PROCESSOR_ARCHITECTURES.get(machine.upper())
+        if native == "x64":
+            return ("x64", "x86")
+        if native == "arm64":
+            if sys.getwindowsversion().build >= ARM64_X64_EMULATION_BUILD:
+                return ("arm64", "x64", "x86")
+            return ("arm64", "x86")
+        return (native,) if native else None
+
+    def installed_runtimes(self) -> dict:
+        import winreg
+        found = {}
+        for runtime, key_path in VC_RUNTIME_KEYS.items():
+            for arch in CATALOG_ARCHITECTURES:
+                # Setups register in either registry view, depending on their own bitness.
+                for view in (winreg.KEY_WOW64_32KEY, winreg.KEY_WOW64_64KEY):
+                    try:
+                        with winreg.OpenKey(
+                            winreg.HKEY_LOCAL_MACHINE, key_path.format(arch=arch), 0, winreg.KEY_READ | view
+                        ) as key:
+                            if winreg.QueryValueEx(key, "Installed")[0] != 1:
+                                continue
+                            try:
+                                version = str(winreg.QueryValueEx(key, "Version")[0]).lstrip("v")
+                            except OSError:
+                                version = ""
+                    except OSError:
+                        continue
+                    found[(runtime, arch)] = version
+                    break
+        return found
+
+
+class FakeSystemProvider(SystemProvider):
+    """A system described up front: for previewing other machines (--system-profile) and for testing off Windows."""
+
+    def __init__(self, architectures=None, runtimes: dict = None):
+        self._architectures = tuple(architectures) if architectures else None
+        self._runtimes = dict(runtimes or {})
+
+    def architectures(self):
+        return self._architectures
+
+    def installed_runtimes(self) -> dict:
+        return dict(self._runtimes)
+
+
+def load_system_profile(path: str) -> FakeSystemProvider:
+    """
+    Read a --system-profile file, e.g. {"architectures": ["x64", "x86"], "runtimes": {"vc14/x64": "14.40.33810"}}.
+
+    Raises ValueError if it cannot be read or is malformed.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Cannot read system profile {path}: {e}") from e
+    architectures = data.get("architectures") if isinstance(data, dict) else None
+    runtimes = data.get("runtimes", {}) if isinstance(data, dict) else None
+    if architectures is not None and (
+        not isinstance(architectures, list) or not set(architectures) <= set(CATALOG_ARCHITECTURES)
+    ):
+        raise ValueError(f"{path}: architectures must be a list of {', '.join(CATALOG_ARCHITECTURES)}")
+    if not isinstance(runtimes, dict) or not all(name.count("/") == 1 for name in runtimes):
+        raise ValueError(f"{path}: runtimes must map 'runtime/arch' to a version")
+    return FakeSystemProvider(
+        architectures, {tuple(name.split("/")): str(version) for name, version in runtimes.items()}
+    )
+
+
+def create_system_provider(options: dict) -> SystemProvider:
+    """The provider for --system-profile, this Windows system, or one that knows nothing elsewhere."""
+    if options.get("system_profile"):
+        return load_system_profile(options["system_profile"])
+    if os.name == "nt":
+        return WindowsSystemProvider()
+    return SystemProvider()
+
+
+# ----------------------------- INSTALL SCHEDULER -----------------------------
+
+DEFAULT_DOWNLOAD_WORKERS = 4
+
+# Silent switches used when the downloaded manifest does not declare its own.
+DEFAULT_SILENT_SWITCHES = {
+    "burn": "/quiet /norestart",
+    "inno": "/VERYSILENT /SUPPRESSMSGBOXES /NORESTART /SP-",
+    "nullsoft": "/S",
+}
+
+MANIFEST_FIELDS = ("PackageIdentifier", "PackageVersion", "InstallerType", "Silent", "InstallerSha256")
+
+
+def parse_package_id(command):
+    """Return the package identifier of a 'winget install <id> ...' command (string or argv), or None."""
+    parts = command.split() if isinstance(command, str) else list(command)
+    for i, part in enumerate(parts):
+        if part in ("install", "upgrade") and i + 1 < len(parts):
+            rest = parts[i + 1:]
+            if rest[0] == "--id" and len(rest) > 1:
+                return rest[1]
+            if not rest[0].startswith("-"):
+                return rest[0]
+    return None
+
+
+def parse_found_version(output: str, package_id: str) -> str:
+    """Version from winget's 'Found <name> [<id>] Version <version>' line ('' if absent)."""
+    match = re.search(r"\[" + re.escape(package_id) + r"\]\s+\S+\s+(\S+)", output or "", re.IGNORECASE)
+    return match.group(1) if match else ""
+
+
+def read_manifest_fields(manifest_path: str) -> dict:
+    """Pick the few fields needed to install a payload from a winget manifest (first occurrence wins)."""
+    fields = {}
+    pattern = re.compile(r"^\s*-?\s*(" + "|".join(MANIFEST_FIELDS) + r"):\s*(.+?)\s*$")
+    try:
+        with open(manifest_path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                match = pattern.match(line)
+                if match and match.group(1) not in fields:
+                    fields[match.group(1)] = match.group(2).strip("'\"")
+    except OSError:
+        pass
+    return fields
+
+
+def find_payload(download_dir: str):
+    """Locate the installer and manifest that 'winget download' wrote to download_dir."""
+    installer = manifest = None
+    for name in sorted(os.listdir(download_dir)):
+        path = os.path.join(download_dir, name)
+        if not os.path.isfile(path):
+            continue
+        if name.lower().endswith((".yaml", ".yml")):
+            manifest = manifest or path
+        else:
+            installer = installer or path
+    if not installer:
+        return None
+    fields = read_manifest_fields(manifest) if manifest else {}
+    return {
+        "path": installer,
+        "type": fields.get("InstallerType", "").lower(),
+        "switches": fields.get("Silent", ""),
+        "version": fields.get("PackageVersion", ""),
+        "sha256": fields.get("InstallerSha256", "").lower(),
+    }
+
+
+def payload_install_command(payload: dict):
+    """Return the argv that installs a downloaded payload silently, or None if winget has to do it."""
+    installer_type = payload.get("type", "")
+    if installer_type in ("msi", "wix"):
+        return ["msiexec", "/i", payload["path"], "/qn", "/norestart"]
+    switches = payload.get("switches") or DEFAULT_SILENT_SWITCHES.get(installer_type)
+    if installer_type in ("exe", "burn", "inno", "nullsoft") and switches:
+        return [payload["path"]] + switches.split()
+    return None
+
+
+def build_import_manifest(package_ids: list, versions: dict = None) -> dict:
+    """Return a 'winget import' file installing package_ids from the winget source."""
+    versions = versions or {}
+    packages = []
+    for package_id in package_ids:
+        package = {"PackageIdentifier": package_id}
+        if versions.get(package_id):
+            package["Version"] = versions[package_id]
+        packages.append(package)
+    return {
+        "$schema": "https://aka.ms/winget-packages.schema.2.0.json",
+        "CreationDate": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "Sources": [{
+            "Packages": packages,
+            "SourceDetails": {
+                "Argument": "https://cdn.winget.microsoft.com/cache",
+                "Identifier": "Microsoft.Winget.Source_8wekyb3d8bbwe",
+                "Name": "winget",
+                "Type": "Microsoft.PreIndexed.Package"
+            }
+        }],
+        "WinGetVersion": "1.6.0"
+    }
+
+
+class InstallScheduler:
+    """
+    Fetch installer payloads concurrently and install them one at a time.
+
+    The scheduler runs on an asyncio event loop: up to download_workers downloads
+    ('winget download') run as concurrent tasks, installs run in catalog order because
+    Windows Installer only allows one install at a time. Processes are started with
+    asyncio.create_subprocess_exec, so no threads are needed. run_async() is the
+    coroutine, run() runs it on a loop of its own (likewise install and preview).
+    Progress is reported through on_event(kind, **data); kinds match the GUI language keys.
+    Every process runs under the supervisor: cancel() (safe from any thread) kills the
+    running process trees, and after run() the status attribute is "completed",
+    "cancelled" or "timeout".
+    """
+
+    def __init__(self, work_dir, on_event, download_workers=DEFAULT_DOWNLOAD_WORKERS, is_cancelled=None,
+                 use_index=True, cache=None, bulk=False, tracer=None, journal=None, resume=False, self_check=None,
+                 supervisor=None, history=None, session=None, lock=None, system=None):
+        self.work_dir = work_dir
+        self.download_dir = os.path.join(work_dir, "downloads")
+        self.on_event = on_event
+        self.download_workers = download_workers
+        self.supervisor = supervisor or ProcessSupervisor()
+        external_cancelled = is_cancelled or (lambda: False)
+        self.is_cancelled = lambda: external_cancelled() or self.supervisor.cancelled.is_set()
+        self.use_index = use_index
+        self.cache = cache
+        self.bulk = bulk
+        self.tracer = tracer or Tracer()
+        self.journal = journal
+        self.resume = resume
+        self.self_check = self_check
+        self.history = history
+        self.session = session
+        self.lock = lock or {}
+        self.system = system or SystemProvider()
+        self.status = None
+        self.timed_out = []
+        self.downloaded_bytes = {}
+        self.last_exit_code = None
+        self.last_output = ""
+
+    def cancel(self):
+        """Stop the run, killing the install and download processes that are still running."""
+        self.supervisor.cancel()
+
+    def using_winget(self):
+        """Context of every winget command: keeps them apart from a winget self-update."""
+        return self.self_check.using_winget() if self.self_check else nullcontext()
+
+    async def run_command(self, command, span: str, on_progress=None, tail_lines=OUTPUT_TAIL_LINES):
+        """Run a command, sending winget installs and upgrades to the worker session if there is one."""
+        async with self.using_winget():
+            return await self._run_command(command, span, on_progress, tail_lines)
+
+    async def _run_command(self, command, span: str, on_progress=None, tail_lines=OUTPUT_TAIL_LINES):
+        if self.session and self.session.usable and self.session.handles(command):
+            command_text = command if isinstance(command, str) else subprocess.list2cmdline(command)
+            with self.tracer.span(span, command=command_text, session=True) as span_args:
+                # The session's pipe protocol is blocking; its requests are serial anyway.
+                out, err, code = await asyncio.to_thread(self.session.run_command, command, on_progress)
+                span_args.update(exit_code=code)
+            if self.session.usable:
+                return out, err, code
+            self.on_event("session_unavailable")
+        return await run_command_async(
+            command, on_progress=on_progress, tracer=self.tracer, span=span, tail_lines=tail_lines,
+            supervisor=self.supervisor
+        )
+
+    async def load_index(self):
+        """Installed package index from the worker session, or from one 'winget list' process."""
+        async with self.using_winget():
+            return await self._load_index()
+
+    async def _load_index(self):
+        if self.session and self.session.usable:
+            with self.tracer.span("winget list", session=True):
+                index = await asyncio.to_thread(self.session.installed_index)
+            if index is not None:
+                return index
+            if not self.session.usable:
+                self.on_event("session_unavailable")
+        return await load_installed_index_async(self.tracer, self.supervisor)
+
+    def locked_version(self, package_id):
+        entry = self.lock.get(package_id.lower()) if package_id else None
+        return entry["version"] if entry else None
+
+    def pin(self, package: CatalogPackage) -> CatalogPackage:
+        """Pin a package to its lockfile version; packages missing from the lockfile resolve as before."""
+        locked = self.locked_version(package.id)
+        if not locked:
+            return package
+        pinned = ("--version", locked)
+        return package._replace(install=package.install + pinned, upgrade=package.upgrade + pinned, version=locked)
+
+    def apply_lock(self, programs: list) -> list:
+        return [program._replace(packages=tuple(map(self.pin, program.packages))) for program in programs]
+
+    def prune(self, programs: list) -> list:
+        """
+        Drop packages this system does not need.
+
+        Packages for an architecture that cannot run here are dropped, and of the
+        packages providing the same runtime for the same architecture only the last
+        one in catalog order is kept: later redistributables replace earlier ones.
+        """
+        architectures = self.system.architectures()
+        providers = {}
+        for program in programs:
+            for package in program.packages:
+                if package.runtime and (architectures is None or package.arch in architectures):
+                    providers[(package.runtime, package.arch)] = package.id
+        pruned = []
+        for program in programs:
+            packages = []
+            for package in program.packages:
+                provider = providers.get((package.runtime, package.arch), package.id)
+                if architectures is not None and package.arch and package.arch not in architectures:
+                    self.on_event("pruned_arch", prog=program.name, package=package.id, arch=package.arch)
+                elif provider != package.id:
+                    self.on_event("superseded", prog=program.name, package=package.id, by=provider)
+                else:
+                    packages.append(package)
+            if packages:
+                pruned.append(program._replace(packages=tuple(packages)))
+        return pruned
+
+    def plan(self, programs: list, index: dict) -> list:
+        """
+        Reduce programs to the packages that still have work to do.
+
+        Missing packages keep their install command, outdated ones are switched to
+        their upgrade command (and the version to reach) and current ones are dropped
+        without starting a process. Packages pinned by the lockfile are current only
+        at exactly the locked version. A runtime winget does not list but the system
+        reports (installed by another setup) counts as current from its min_version on.
+        """
+        runtimes = self.system.installed_runtimes()
+        planned = []
+        for program in programs:
+            packages = []
+            for package in program.packages:
+                entry = lookup_installed(index, package.id)
+                locked = self.locked_version(package.id)
+                detected = runtimes.get((package.runtime, package.arch)) if package.runtime else None
+                if entry is None and detected is not None and not locked and (
+                    version_key(detected) >= version_key(package.version or package.min_version)
+                ):
+                    self.on_event("runtime_detected", prog=program.name, package=package.id, version=detected)
+                elif entry is None or (locked and entry["version"] != locked):
+                    packages.append(package)
+                elif locked or not entry["available"]:
+                    self.on_event("up_to_date", prog=program.name, package=package.id, version=entry["version"])
+                else:
+                    packages.append(package._replace(install=package.upgrade, version=entry["available"]))
+            if packages:
+                planned.append(program._replace(packages=tuple(packages)))
+        return planned
+
+    async def download(self, package_id: str, version: str = None, fresh: bool = False):
+        """
+        Fetch the payload of one package, returning its payload dict or None.
+
+        A cached payload (of the given version, if any) is used without starting winget
+        unless fresh is set; fresh downloads are added to the cache. Payloads of locked
+        packages must match the installer hash of the lockfile.
+        """
+        if self.is_cancelled():
+            return None
+        payload = await self._download(package_id, version, fresh)
+        locked = self.lock.get(package_id.lower())
+        if payload and locked and payload["sha256"] != locked["sha256"]:
+            self.on_event("lock_hash_mismatch", package=package_id, version=locked["version"])
+            return None
+        return payload
+
+    async def _download(self, package_id: str, version: str, fresh: bool):
+        if self.cache and not fresh:
+            try:
+                # Hashing a payload is disk-bound; the loop keeps serving the other commands.
+                cached = await asyncio.to_thread(self.cache.lookup, package_id, version)
+            except ValueError:
+                cached = None
+                self.on_event("cache_hash_mismatch", package=package_id)
+            if cached:
+                self.on_event("cache_hit", package=package_id, version=cached["version"])
+                return cached
+        target = os.path.join(self.download_dir, package_id)
+        shutil.rmtree(target, ignore_errors=True)
+        os.makedirs(target, exist_ok=True)
+        download_cmd = [
+            "winget", "download", "--id", package_id, "--exact", "--download-directory", target,
+            "--accept-source-agreements", "--accept-package-agreements"
+        ]
+        if version:
+            download_cmd += ["--version", version]
+        try:
+            _, _, code = await self.run_command(download_cmd, "download")
+        except CommandTimeout as e:
+            self.on_event("command_timed_out", cmd=e.command, seconds=e.seconds)
+            code = 1
+        payload = find_payload(target) if code == 0 else None
+        if payload:
+            self.downloaded_bytes[package_id.lower()] = os.path.getsize(payload["path"])
+        if payload and self.cache:
+            try:
+                payload = await asyncio.to_thread(self.cache.store, package_id, payload)
+            except OSError as e:
+                print(f"Failed to cache payload of {package_id}:", e)
+            if payload is None:
+                self.on_event("cache_hash_mismatch", package=package_id)
+        self.on_event("downloaded" if payload else "download_failed", package=package_id)
+        return payload
+
+    def install(self, program: CatalogProgram, package: CatalogPackage, payload, on_progress=None) -> str:
+        """
+        Install one package, preferring the prefetched payload and falling back to winget.
+
+        Returns the outcome ("installed", "already_installed", "upgraded", "failed" or
+        "timeout") after recording it in the journal.
+        """
+        return asyncio.run(self.install_async(program, package, payload, on_progress))
+
+    async def install_async(self, program: CatalogProgram, package: CatalogPackage, payload, on_progress=None) -> str:
+        started = time.perf_counter()
+        self.last_exit_code = None
+        self.last_output = ""
+        try:
+            outcome = await self._install(program, package, payload, on_progress)
+        except CommandTimeout as e:
+            self.on_event("command_timed_out", cmd=e.command, seconds=e.seconds)
+            outcome = "timeout"
+        if self.journal:
+            # Without a payload or pin, winget chose the version and names it in its output.
+            version = (payload or {}).get("version") or package.version or parse_found_version(
+                self.last_output, package.id
+            )
+            self.journal.record(package.id, outcome, version=version)
+        if self.history:
+            self.history.record_package(
+                package.id, program.name, outcome, time.perf_counter() - started,
+                self.downloaded_bytes.get(package.id.lower(), 0), self.last_exit_code
+            )
+        return outcome
+
+    async def run_classified(self, command, span: str, program: CatalogProgram, on_progress=None):
+        """
+        Run a command and classify its exit code, retrying with backoff while a retry can help.
+
+        Returns (stdout, stderr, code, outcome, action).
+        """
+        attempt = 0
+        while True:
+            out, err, code = await self.run_command(command, span, on_progress=on_progress)
+            self.last_exit_code = code
+            self.last_output = out
+            outcome, action = classify_exit_code(code)
+            if action != ACTION_RETRY or attempt >= RETRY_ATTEMPTS:
+                return out, err, code, outcome, action
+            delay = RETRY_BACKOFF * 3 ** attempt
+            attempt += 1
+            self.on_event(
+                "retrying", prog=program.name, reason=outcome, delay=delay, attempt=attempt, attempts=RETRY_ATTEMPTS
+            )
+            await self.supervisor.sleep_async(delay)
+
+    def _accept(self, program: CatalogProgram, command, out: str, outcome: str, done: str) -> str:
+        """Report a result classified as done and return the scheduler outcome."""
+        if outcome in ("already_installed", "no_update"):
+            self.on_event("already_installed", prog=program.name)
+            return "already_installed"
+        if out.strip():
+            command_text = command if isinstance(command, str) else subprocess.list2cmdline(command)
+            self.on_event("output_for", cmd=command_text, output=out.strip())
+        if outcome == "reboot_required":
+            self.on_event("reboot_required", prog=program.name)
+        return done
+
+    async def _install(self, program: CatalogProgram, package: CatalogPackage, payload, on_progress=None) -> str:
+        argv = payload_install_command(payload) if payload else None
+        if argv:
+            out, _, _, outcome, action = await self.run_classified(argv, "install payload", program)
+            if action == ACTION_DONE:
+                return self._accept(program, argv, out, outcome, "installed")
+        is_upgrade = package.install == package.upgrade
+        out, err, code, outcome, action = await self.run_classified(package.install, "install", program, on_progress)
+        if action == ACTION_DONE:
+            return self._accept(program, package.install, out, outcome, "upgraded" if is_upgrade else "installed")
+        if action != ACTION_UPGRADE or is_upgrade:
+            # Only start a second process when the exit code says an upgrade can succeed.
+            self.on_event(
+                "install_failed", prog=program.name, reason=outcome, code=format_exit_code(code),
+                error=err.strip() or out.strip()
+            )
+            return "failed"
+        self.on_event("error_installing", prog=program.name, error=err.strip() or out.strip())
+        upgrade_cmd = package.upgrade
+        upgrade_out, upgrade_err, upgrade_code, upgrade_outcome, upgrade_action = await self.run_classified(
+            upgrade_cmd, "upgrade fallback", program, on_progress
+        )
+        if upgrade_action != ACTION_DONE:
+            self.on_event(
+                "error_upgrading", prog=program.name,
+                error=upgrade_err.strip() or upgrade_out.strip() or format_exit_code(upgrade_code)
+            )
+            return "failed"
+        if upgrade_outcome in ("already_installed", "no_update"):
+            # Installed and nothing newer available.
+            return self._accept(program, upgrade_cmd, upgrade_out, upgrade_outcome, "already_installed")
+        self.on_event("upgraded_successfully", prog=program.name)
+        return self._accept(program, upgrade_cmd, upgrade_out, upgrade_outcome, "upgraded")
+
+    async def resolve_async(self, programs: list) -> dict:
+        """
+        Download the current version of every package once and return the lockfile entries
+        {package_id: {"version", "sha256", "type"}} of those whose payload matched its manifest hash.
+        """
+        package_ids = list(dict.fromkeys(package.id for program in programs for package in program.packages))
+        semaphore = asyncio.Semaphore(max(1, self.download_workers))
+
+        async def fetch(package_id):
+            async with semaphore:
+                return await self.download(package_id, fresh=True)
+
+        downloads = [asyncio.ensure_future(fetch(package_id)) for package_id in package_ids]
+        resolved = {}
+        try:
+            for package_id, download in zip(package_ids, downloads):
+                payload = await download
+                if payload and payload["version"] and (
+                    payload["sha256"] == await asyncio.to_thread(file_sha256, payload["path"])
+                ):
+                    resolved[package_id] = {
+                        "version": payload["version"], "sha256": payload["sha256"], "type": payload["type"]
+                    }
+                    self.on_event("locked", package=package_id, version=payload["version"])
+                else:
+                    self.on_event("lock_failed", package=package_id)
+        finally:
+            await cancel_tasks(downloads)
+            shutil.rmtree(self.download_dir, ignore_errors=True)
+        return resolved
+
+    def skip_journaled(self, programs: list) -> list:
+        """Drop packages that the journal of an interrupted run already completed."""
+        remaining = []
+        for program in programs:
+            packages = []
+            for package in program.packages:
+                if self.journal.succeeded(package.id):
+                    self.on_event("resume_skipped", prog=program.name, package=package.id)
+                else:
+                    packages.append(package)
+            if packages:
+                remaining.append(program._replace(packages=tuple(packages)))
+        return remaining
+
+    async def bulk_import(self, programs: list) -> list:
+        """
+        Install all programs with a single 'winget import' and return what is still left to do.
+
+        The result is mapped back to packages through a fresh installed index; packages
+        that did not end up installed and current are returned for the per-package path.
+        """
+        package_ids = [package.id for program in programs for package in program.packages]
+        import_file = os.path.join(self.work_dir, "winget_import.json")
+        with open(import_file, "w", encoding="utf-8") as f:
+            json.dump(build_import_manifest(
+                package_ids, {package_id: self.locked_version(package_id) for package_id in package_ids}
+            ), f, indent=2)
+        self.on_event("bulk_importing", count=len(package_ids))
+        self.on_event("progress_current", value=0)
+        try:
+            await self.run_command(
+                [
+                    "winget", "import", "--import-file", import_file, "--ignore-unavailable",
+                    "--accept-source-agreements", "--accept-package-agreements"
+                ],
+                "winget import",
+                on_progress=lambda percent: self.on_event("progress_current", value=percent)
+            )
+        except CommandTimeout as e:
+            # Whatever the import finished is picked up by the index below.
+            self.on_event("command_timed_out", cmd=e.command, seconds=e.seconds)
+        index = await self.load_index()
+        if index is None:
+            return programs
+        remaining = []
+        installed_count = 0
+        for program in programs:
+            packages = []
+            for package in program.packages:
+                entry = lookup_installed(index, package.id)
+                locked = self.locked_version(package.id)
+                if entry is not None and (entry["version"] == locked if locked else not entry["available"]):
+                    installed_count += 1
+                    if self.journal:
+                        self.journal.record(package.id, "imported", version=entry["version"])
+                else:
+                    packages.append(package)
+            if packages:
+                remaining.append(program._replace(packages=tuple(packages)))
+        self.on_event("bulk_imported", installed=installed_count, remaining=len(package_ids) - installed_count)
+        return remaining
+
+    def run(self, programs: list) -> list:
+        """
+        Install every program and return the names of those that failed.
+
+        Programs not reached because the run was cancelled or timed out are not listed;
+        check the status attribute for that.
+        """
+        return asyncio.run(self.run_async(programs))
+
+    async def run_async(self, programs: list) -> list:
+        self.status = None
+        self.timed_out = []
+        self.supervisor.start()
+        if self.history:
+            self.history.start_run()
+        failed = []
+        try:
+            await self._run(programs, failed)
+            self.status = "cancelled" if self.is_cancelled() else "completed"
+        except RunAborted as e:
+            self.status = e.reason
+            if e.reason == "timeout":
+                self.on_event("run_timed_out", seconds=self.supervisor.run_timeout)
+        finally:
+            if self.session:
+                await asyncio.to_thread(self.session.close)
+        if self.self_check:
+            await self.self_check.wait()
+        if self.history:
+            self.history.finish_run(self.status, self.self_check.version if self.self_check else "")
+        return failed
+
+    def expected_seconds(self, programs: list) -> list:
+        """Expected install time of each program, from the run history (equal weights without one)."""
+        expected = self.history.expected_durations() if self.history else {}
+        fallback = percentile(list(expected.values()), 50) if expected else DEFAULT_PACKAGE_SECONDS
+        return [
+            sum(expected.get(package.id.lower(), fallback) for package in program.packages)
+            for program in programs
+        ]
+
+    async def prepare(self, programs: list, dry_run: bool = False) -> list:
+        """
+        Reduce programs to the commands a run will start: prune, pin, skip journaled and plan.
+
+        A dry run leaves the journal of an interrupted run in place.
+        """
+        programs = self.prune(programs)
+        if self.lock:
+            programs = self.apply_lock(programs)
+        if self.journal:
+            if self.resume:
+                programs = self.skip_journaled(programs)
+            elif not dry_run:
+                self.journal.reset()
+        if self.use_index:
+            index = await self.load_index()
+            if index is not None:
+                programs = self.plan(programs, index)
+        return programs
+
+    def preview(self, programs: list) -> list:
+        """
+        Plan a run without installing anything and describe each command it would start.
+
+        Returns one dict per package: program, package, action ("install" or "upgrade"),
+        version, command, cached, download_bytes (0 when cached, None when unknown) and
+        seconds (expected install time, from the run history).
+        """
+        return asyncio.run(self.preview_async(programs))
+
+    async def preview_async(self, programs: list) -> list:
+        programs = await self.prepare(programs, dry_run=True)
+        if self.session:
+            await asyncio.to_thread(self.session.close)
+        sizes = self.history.expected_sizes() if self.history else {}
+        expected = self.history.expected_durations() if self.history else {}
+        fallback = percentile(list(expected.values()), 50) if expected else DEFAULT_PACKAGE_SECONDS
+        rows = []
+        for program in programs:
+            for package in program.packages:
+                cached = self.cache.cached_size(package.id, package.version) if self.cache else None
+                rows.append({
+                    "program": program.name,
+                    "package": package.id,
+                    "action": "upgrade" if package.install == package.upgrade else "install",
+                    "version": package.version or "",
+                    "command": subprocess.list2cmdline(package.install),
+                    "cached": cached is not None,
+                    "download_bytes": 0 if cached is not None else sizes.get(package.id.lower()),
+                    "seconds": expected.get(package.id.lower(), fallback),
+                })
+        return rows
+
+    async def _run(self, programs: list, failed: list):
+        if self.self_check:
+            self.self_check.start()
+        programs = await self.prepare(programs)
+        if self.bulk and programs and not self.is_cancelled():
+            programs = await self.bulk_import(programs)
+        total = len(programs)
+        weights = self.expected_seconds(programs)
+        total_weight = sum(weights) or 1
+        done_weight = 0
+        run_started = time.perf_counter()
+        self.on_event("progress_total", value=0, eta=total_weight if self.history else None)
+        semaphore = asyncio.Semaphore(self.download_workers) if self.download_workers > 0 else None
+
+        async def fetch(package):
+            async with semaphore:
+                return await self.download(package.id, package.version)
+
+        downloads = [
+            [asyncio.ensure_future(fetch(package)) if semaphore else None for package in program.packages]
+            for program in programs
+        ]
+        try:
+            for i, program in enumerate(programs):
+                if self.is_cancelled():
+                    break
+                self.on_event("installing", prog=program.name, index=i + 1, total=total)
+                self.on_event("progress_current", value=0)
+                installed_successfully = True
+                num_commands = len(program.packages)
+                with self.tracer.span("package", package=program.name) as span_args:
+                    for j, package in enumerate(program.packages):
+                        if self.is_cancelled():
+                            break
+                        payload = await downloads[i][j] if downloads[i][j] else None
+
+                        def on_progress(percent, j=j):
+                            self.on_event("progress_current", value=((j + percent / 100) / num_commands) * 100)
+
+                        outcome = await self.install_async(program, package, payload, on_progress=on_progress)
+                        if outcome not in JOURNAL_SUCCESS_OUTCOMES:
+                            installed_successfully = False
+                        if outcome == "timeout":
+                            self.timed_out.append(program.name)
+                        self.on_event("progress_current", value=((j + 1) / num_commands) * 100)
+                    span_args["success"] = installed_successfully
+                if not installed_successfully:
+                    failed.append(program.name)
+                if installed_successfully or not self.is_cancelled():
+                    self.on_event("package_done", prog=program.name, success=installed_successfully)
+                # The bar advances by expected duration; the ETA scales the expected rest by the pace so far.
+                done_weight += weights[i]
+                eta = None
+                if self.history and done_weight:
+                    eta = (total_weight - done_weight) * (time.perf_counter() - run_started) / done_weight
+                self.on_event("progress_total", value=done_weight / total_weight * 100, eta=eta)
+        finally:
+            await cancel_tasks(task for row in downloads for task in row if task)
+            shutil.rmtree(self.download_dir, ignore_errors=True)
+        if self.journal and not failed and not self.is_cancelled():
+            # Nothing left to resume once a run has gone through completely.
+            self.journal.reset()
+
+
+# ----------------------------- LOCKFILE -----------------------------
+
+LOCK_FILE = "universal_runtime.lock.json"
+LOCK_FORMAT = 1
+
+
+def load_lockfile(path: str) -> dict:
+    """Read a lockfile and return {package_id.lower(): {"version", "sha256", "type"}}; raises ValueError if invalid."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except OSError as e:
+        raise ValueError(f"Cannot read lockfile {path}: {e}") from e
+    if not isinstance(data, dict) or data.get("format") != LOCK_FORMAT or not isinstance(data.get("packages"), dict):
+        raise ValueError(f"{path} is not a lockfile of format {LOCK_FORMAT}")
+    packages = {}
+    for package_id, entry in data["packages"].items():
+        if not isinstance(entry, dict) or not entry.get("version") or not entry.get("sha256"):
+            raise ValueError(f"Lockfile entry for {package_id} needs a version and sha256")
+        packages[package_id.lower()] = entry
+    return packages
+
+
+def write_lockfile(path: str, packages: dict, winget_version: str = ""):
+    """Write the lockfile atomically (readers never see a partial file)."""
+    data = {
+        "format": LOCK_FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "winget_version": winget_version,
+        "packages": packages,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def run_lock(options: dict) -> int:
+    """
+    The --lock command: refresh the winget sources once, resolve every catalog package to
+    an exact version and installer hash, and write the lockfile.
+
+    Payloads are fetched with 'winget download' (whose manifest carries version and hash
+    independent of the system language); with --cache-dir they also seed the cache.
+    Returns 0, 1 if winget is missing or the sources cannot be refreshed, or 2 if some
+    packages could not be resolved (the lockfile is written without them).
+    """
+    def log(message):
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}")
+
+    if not winget_available():
+        log("winget not installed. Aborting.")
+        return 1
+    work_dir = os.path.join(tempfile.gettempdir(), "universal_runtime_lock")
+    os.makedirs(work_dir, exist_ok=True)
+
+    unresolved = []
+
+    def on_event(kind, **data):
+        if kind == "lock_failed":
+            unresolved.append(data["package"])
+        message = format_silent_event(kind, data)
+        if message:
+            log(message)
+
+    scheduler = create_scheduler(dict(options, from_lock=None), work_dir, on_event)
+    scheduler.supervisor.start()
+
+    async def resolve():
+        log("Updating winget sources...")
+        _, err, code = await scheduler.run_command("winget source update", "winget source update")
+        if code != 0:
+            log(f"winget source update failed ({format_exit_code(code)}): {err.strip()}")
+            return None, ""
+        out, _, code = await scheduler.run_command("winget --version", "winget --version")
+        return await scheduler.resolve_async(build_program_list(options)), out.strip() if code == 0 else ""
+
+    try:
+        packages, winget_version = asyncio.run(resolve())
+    except (CommandTimeout, RunAborted) as e:
+        log(f"Stopped: {e}")
+        return 1
+    if packages is None:
+        return 1
+    write_lockfile(options["lock"], packages, winget_version)
+    log(f"Wrote {len(packages)} locked packages to {options['lock']}.")
+    if unresolved:
+        log("Not locked: " + ", ".join(unresolved))
+        return 2
+    return 0
+
+
+def format_silent_event(kind: str, data: dict):
+    """Render a scheduler event as a silent-mode log line (None for events that are not logged)."""
+    if kind == "installing":
+        return f"[{data['index']}/{data['total']}] Installing {data['prog']}..."
+    if kind == "downloaded":
+        return f"Downloaded {data['package']}."
+    if kind == "bulk_importing":
+        return f"Installing {data['count']} packages with a single winget import..."
+    if kind == "bulk_imported":
+        return f"winget import: {data['installed']} installed, {data['remaining']} will be retried one at a time."
+    if kind == "checking_winget_updates":
+        return "Checking winget..."
+    if kind == "winget_version":
+        return f"winget version: {data['version']}"
+    if kind == "winget_check_cached":
+        return f"winget {data['version']} was checked recently, skipping the update check."
+    if kind == "winget_up_to_date":
+        return "winget up to date."
+    if kind == "winget_updating":
+        return f"Updating winget to {data['version']}, installs wait for it..."
+    if kind == "winget_update_output":
+        return "winget upgrade output: " + data["output"]
+    if kind == "session_unavailable":
+        return "winget worker session could not be started, running one winget process per command."
+    if kind == "resume_skipped":
+        return f"{data['package']} was completed by the interrupted run, skipping."
+    if kind == "cache_hit":
+        return f"{data['package']} {data['version']} taken from the cache."
+    if kind == "locked":
+        return f"Locked {data['package']} at {data['version']}."
+    if kind == "lock_failed":
+        return f"Could not resolve {data['package']}, it is left out of the lockfile."
+    if kind == "lock_hash_mismatch":
+        return f"Payload of {data['package']} does not match the lockfile hash of {data['version']}, leaving it to winget."
+    if kind == "cache_hash_mismatch":
+        return f"Hash check failed for {data['package']}, downloading it again."
+    if kind == "download_failed":
+        return f"Could not prefetch {data['package']}, winget will download it during install."
+    if kind == "already_installed":
+        return f"{data['prog']} already installed (detected)."
+    if kind == "up_to_date":
+        return f"{data['package']} is up to date ({data['version']}), skipping."
+    if kind == "pruned_arch":
+        return f"{data['package']} is for {data['arch']}, which this system does not run, skipping."
+    if kind == "superseded":
+        return f"{data['package']} is superseded by {data['by']}, skipping."
+    if kind == "runtime_detected":
+        return f"{data['package']}: runtime {data['version']} is already installed, skipping."
+    if kind == "retrying":
+        return (f"{data['prog']}: {data['reason']}, retrying in {data['delay']:g} s "
+                f"({data['attempt']}/{data['attempts']})...")
+    if kind == "install_failed":
+        return f"Installing {data['prog']} failed ({data['reason']}, exit code {data['code']}): {data['error']}"
+    if kind == "reboot_required":
+        return f"{data['prog']} needs a reboot to finish."
+    if kind == "error_installing":
+        return f"Error installing {data['prog']}: {data['error']} - attempting upgrade."
+    if kind == "error_upgrading":
+        return f"Upgrade failed for {data['prog']}: {data['error']}"
+    if kind == "upgraded_successfully":
+        return f"{data['prog']} upgraded successfully."
+    if kind == "output_for":
+        return f"Output: {data['output'].splitlines()[-1]}"
+    if kind == "command_timed_out":
+        return f"Timed out after {data['seconds']:g} s, process tree killed: {data['cmd']}"
+    if kind == "run_timed_out":
+        return f"Run time limit of {data['seconds']:g} s reached, stopping."
+    return None
+
+
+def create_tracer(options: dict, work_dir: str) -> Tracer:
+    """Return the tracer selected by --trace[=path] (disabled when the switch is absent)."""
+    if not options["trace"]:
+        return Tracer()
+    if options["trace"] is True:
+        return Tracer(os.path.join(work_dir, "installer_trace.json"))
+    return Tracer(os.path.abspath(options["trace"]))
+
+
+def create_scheduler(options: dict, work_dir: str, on_event, is_cancelled=None, tracer=None) -> InstallScheduler:
+    """Build the InstallScheduler configured by the command line options."""
+    supervisor = ProcessSupervisor(options["command_timeout"], options["run_timeout"])
+    cache = None
+    if options["cache_dir"]:
+        try:
+            cache = PayloadCache(options["cache_dir"], options["cache_max_mb"] * 1024 * 1024)
+        except OSError as e:
+            print("Payload cache unavailable:", e)
+    return InstallScheduler(
+        work_dir,
+        on_event,
+        download_workers=options["download_workers"],
+        is_cancelled=is_cancelled,
+        use_index=not options["reinstall"],
+        cache=cache,
+        bulk=options["bulk"],
+        tracer=tracer,
+        journal=InstallJournal(os.path.join(work_dir, JOURNAL_FILE), options["journal_max_age"]),
+        resume=options["resume"],
+        self_check=WingetSelfCheck(
+            os.path.join(tempfile.gettempdir(), WINGET_CHECK_FILE),
+            options["winget_check_ttl"],
+            on_event=on_event,
+            tracer=tracer,
+            supervisor=supervisor
+        ),
+        supervisor=supervisor,
+        history=RunHistory(history_path(options)),
+        session=WingetSession(
+            options["session_worker"].split() if isinstance(options["session_worker"], str) else None,
+            supervisor=supervisor
+        ) if options["session_worker"] else None,
+        lock=load_lockfile(options["from_lock"]) if options["from_lock"] else None,
+        system=create_system_provider(options)
+    )
+
+
+def history_path(options: dict) -> str:
+    """Run history database selected by --history (shared by GUI and silent runs by default)."""
+    return os.path.abspath(options["history"]) if options["history"] else os.path.join(tempfile.gettempdir(), HISTORY_FILE)
+
+
+def history_report(options: dict) -> str:
+    """Text of the --report command."""
+    return format_history_report(RunHistory(history_path(options)).report())
+
+
+# ----------------------------- PLAN PREVIEW -----------------------------
+
+def format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}:{seconds:02d} min" if minutes else f"{seconds} s"
+
+
+def format_size(size) -> str:
+    """Download size for the plan preview ('?' when unknown)."""
+    if size is None:
+        return "?"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.0f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def format_plan(rows: list) -> str:
+    """Render InstallScheduler.preview() as the text of the --plan command."""
+    if not rows:
+        return "Nothing to do: every selected package is installed and current."
+    width = max(len("Package"), *(len(row["package"]) for row in rows))
+    lines = [f"{'Package':<{width}}  {'Action':<7}  {'Version':<14}  {'Download':>9}  {'Time':>9}"]
+    for row in rows:
+        download = "cached" if row["cached"] else format_size(row["download_bytes"])
+        lines.append(f"{row['package']:<{width}}  {row['action']:<7}  {row['version'] or 'latest':<14}  "
+                     f"{download:>9}  {format_eta(row['seconds']):>9}")
+        lines.append(f"    {row['command']}")
+    unknown = sum(1 for row in rows if row["download_bytes"] is None)
+    total = f"{len(rows)} commands, download {format_size(sum(row['download_bytes'] or 0 for row in rows))}"
+    if unknown:
+        total += f" (+{unknown} of unknown size)"
+    lines.append(total + f", about {format_eta(sum(row['seconds'] for row in rows))}.")
+    return "\n".join(lines)
+
+
+def preview_plan(options: dict, programs, work_dir: str, on_event, tracer=None) -> list:
+    """
+    Plan a run of programs on this system without installing anything, see InstallScheduler.preview().
+
+    Only 'winget list' runs; skipped packages are reported through on_event.
+    """
+    # One 'winget list' does not pay for starting a worker session.
+    scheduler = create_scheduler(dict(options, session_worker=None), work_dir, on_event, tracer=tracer)
+    scheduler.supervisor.start()
+    return scheduler.preview(programs)
+
+
+def run_plan(options: dict) -> int:
+    """The --plan command: print what a silent run would install. Returns 0, or 1 if it cannot plan."""
+    try:
+        programs = build_program_list(options)
+    except ValueError as e:
+        print(e)
+        return 1
+    if not winget_available():
+        print("winget not installed.")
+        return 1
+    work_dir = os.path.join(tempfile.gettempdir(), "universal_runtime_silent")
+    os.makedirs(work_dir, exist_ok=True)
+
+    def on_event(kind, **data):
+        message = format_silent_event(kind, data)
+        if message:
+            print(message)
+
+    try:
+        rows = preview_plan(options, programs, work_dir, on_event)
+    except RunAborted as e:
+        print(f"Stopped: {e}")
+        return 1
+    print(format_plan(rows))
+    return 0
+
+
+# ----------------------------- EVENT STREAM API -----------------------------
+
+# Typed events yielded by InstallEngine.run().
+# StatusEvent: a package starts (state "installing"), or the run ends with state
+#   "completed", "cancelled" or "timeout" (program, index and total are then None).
+# LogEvent: any other scheduler event; kind matches the GUI language keys.
+# ProgressEvent: scope "package" or "total", percent from 0 to 100; total progress carries
+#   the estimated seconds left in eta when a run history is kept.
+# ResultEvent: one per package that was attempted.
+StatusEvent = namedtuple("StatusEvent", ["state", "program", "index", "total"])
+LogEvent = namedtuple("LogEvent", ["kind", "data"])
+ProgressEvent = namedtuple("ProgressEvent", ["scope", "percent", "eta"], defaults=(None,))
+ResultEvent = namedtuple("ResultEvent", ["program", "success"])
+
+
+def to_engine_event(kind: str, data: dict):
+    """Convert a scheduler on_event call into a typed event."""
+    if kind == "installing":
+        return StatusEvent("installing", data["prog"], data["index"], data["total"])
+    if kind in ("progress_current", "progress_total"):
+        return ProgressEvent("package" if kind == "progress_current" else "total", data["value"], data.get("eta"))
+    if kind == "package_done":
+        return ResultEvent(data["prog"], data["success"])
+    return LogEvent(kind, data)
+
+
+def format_engine_event(event):
+    """Render a typed event as a silent-mode log line (None for events that are not logged)."""
+    if isinstance(event, StatusEvent) and event.program:
+        return format_silent_event("installing", {"prog": event.program, "index": event.index, "total": event.total})
+    if isinstance(event, LogEvent):
+        return format_silent_event(event.kind, event.data)
+    return None
+
+
+class InstallEngine:
+    """
+    asyncio front end of the install engine, for the GUI, silent mode and provisioning scripts.
+
+        engine = InstallEngine(options, work_dir)
+        async for event in engine.run(programs):
+            ...
+
+    The scheduler runs as a task on the caller's event loop and starts its processes
+    with asyncio.create_subprocess_exec, so a run needs no threads of its own; events
+    are yielded as they happen. After the iteration, status and failed hold the outcome
+    of the run.
+    Closing the iterator early (breaking out of the loop, then aclose() or garbage
+    collection) cancels the run.
+    """
+
+    def __init__(self, options: dict = None, work_dir: str = None, tracer=None):
+        self.options = options or parse_options([])
+        self.work_dir = work_dir or os.getcwd()
+        self.tracer = tracer
+        self.scheduler = None
+        self.status = None
+        self.failed = []
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop the run (also before it started); running processes are killed."""
+        self._cancelled.set()
+        if self.scheduler:
+            self.scheduler.cancel()
+
+    async def run(self, programs: list = None):
+        """Run programs (the catalog selection of the options by default), yielding events as they happen."""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def on_event(kind, **data):
+            # Thread-safe: the worker session reports progress from the thread that reads its pipe.
+            loop.call_soon_threadsafe(events.put_nowait, to_engine_event(kind, data))
+
+        self.scheduler = create_scheduler(
+            self.options, self.work_dir, on_event, is_cancelled=self._cancelled.is_set, tracer=self.tracer
+        )
+        if self._cancelled.is_set():
+            self.scheduler.cancel()
+        programs = build_program_list(self.options) if programs is None else programs
+        done = asyncio.ensure_future(self.scheduler.run_async(programs))
+        # Queued after every event the run emitted, so nothing is lost.
+        done.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+            self.failed = await done
+        finally:
+            if not done.done():
+                self.cancel()
+                await asyncio.shield(done)
+            self.status = self.scheduler.status
+        yield StatusEvent(self.status, None, None, None)
+
+
+def run_silent_install(options=None):
+    """Perform unattended installation of all predefined runtimes."""
+    options = options or parse_options([])
+    # Prepare logging
+    temp_dir = tempfile.gettempdir()
+    work_dir = os.path.join(temp_dir, "universal_runtime_silent")
+    os.makedirs(work_dir, exist_ok=True)
+    os.chdir(work_dir)
+    log_file = LogSink(os.path.join(work_dir, "installer_log.txt"), header="Universal Runtime Installer Silent Log")
+    silent_log("Starting silent installation...", log_file)
+    tracer = create_tracer(options, work_dir)
+    try:
+        try:
+            programs = build_program_list(options)
+        except ValueError as e:
+            silent_log(f"{e}. Aborting silent install.", log_file)
+            return 1
+        if not winget_available():
+            silent_log("winget not installed. Aborting silent install.", log_file)
+            return 1
+        engine = InstallEngine(options, work_dir, tracer=tracer)
+
+        async def print_events():
+            async for event in engine.run(programs):
+                message = format_engine_event(event)
+                if message:
+                    silent_log(message, log_file)
+
+        asyncio.run(print_events())
+        scheduler = engine.scheduler
+        failed = engine.failed
+    finally:
+        tracer.save()
+    if scheduler.status == "timeout" or scheduler.timed_out:
+        silent_log("Stopped by a time limit. Timed out: " + (', '.join(scheduler.timed_out) or "whole run"), log_file)
+        if failed:
+            silent_log("Failed: " + ', '.join(failed), log_file)
+        return 3
+    if failed:
+        silent_log("Completed with errors. Failed: " + ', '.join(failed), log_file)
+        return 2
+    else:
+        silent_log("All installations completed successfully.", log_file)
+        return 0
+
+
+# ----------------------------- FLEET ORCHESTRATION -----------------------------
+
+FLEET_REPORT_FILE = "fleet_report.json"
+DEFAULT_FLEET_CONCURRENCY = 8
+DEFAULT_HOST_TIMEOUT = 7200
+
+# Host status by the exit code of the silent run (see run_silent_install).
+FLEET_EXIT_STATUS = {0: "ok", 1: "aborted", 2: "failed_packages", 3: "timed_out"}
+
+# Options passed on to the silent run on every host.
+FLEET_FORWARDED_OPTIONS = (
+    "reinstall", "bulk", "resume", "download-workers", "cache-dir", "cache-max-mb", "from-lock", "session-worker",
+    "command-timeout", "run-timeout", "journal-max-age", "winget-check-ttl", "catalog", "only", "skip"
+)
+
+# Forwarded options naming files or folders, which remote hosts must reach under the same path.
+FLEET_PATH_OPTIONS = ("catalog", "from-lock", "cache-dir")
+
+# Command templates of the built-in remote transports; {host} and {installer} are filled in
+# and the installer's switches are appended.
+FLEET_TRANSPORTS = {
+    "psexec": r"psexec \\{host} -accepteula -nobanner -s -h {installer}",
+    "ssh": "ssh -o BatchMode=yes {host} {installer}",
+}
+
+# Runs the silent engine in a child interpreter (the local transport of source checkouts).
+LOCAL_HOST_SCRIPT = (
+    "import sys; sys.path.insert(0, sys.argv.pop(1)); import installer_core as core; "
+    "sys.exit(core.run_silent_install(core.parse_options(sys.argv[1:])))"
+)
+
+
+def load_inventory(path: str) -> list:
+    """
+    Read a host inventory: one host per line (the first field of CSV or whitespace separated lines).
+
+    Blank lines and '#' comments are skipped and duplicates dropped; raises ValueError
+    if the file cannot be read or lists no host.
+    """
+    try:
+        with open(path, encoding="utf-8-sig") as f:
+            lines = f.read().splitlines()
+    except OSError as e:
+        raise ValueError(f"Cannot read inventory {path}: {e}") from e
+    hosts = []
+    for line in lines:
+        fields = line.split("#", 1)[0].replace(",", " ").split()
+        if fields and fields[0] not in hosts:
+            hosts.append(fields[0])
+    if not hosts:
+        raise ValueError(f"Inventory {path} lists no hosts")
+    return hosts
+
+
+def is_shared_path(path: str) -> bool:
+    """Tell whether a path is a UNC path (\\\\server\\share\\...), which reads the same on every host."""
+    return path.startswith(("\\\\", "//"))
+
+
+def local_path_options(options: dict) -> list:
+    """Forwarded path options that point to this machine, so a remote host cannot read them."""
+    return [
+        name for name in FLEET_PATH_OPTIONS
+        if options[name.replace("-", "_")] and not is_shared_path(options[name.replace("-", "_")])
+    ]
+
+
+def installer_path() -> str:
+    """Path of this installer (the executable of frozen builds)."""
+    if getattr(sys, "frozen", False):
+        return sys.executable
+    return os.path.abspath(sys.argv[0] or __file__)
+
+
+def host_arguments(options: dict) -> list:
+    """Switches of the silent run on each host: /silent plus every forwarded option that differs from its default."""
+    defaults = parse_options([])
+    arguments = ["/silent"]
+    for name in FLEET_FORWARDED_OPTIONS:
+        key = name.replace("-", "_")
+        value = options[key]
+        if value == defaults[key]:
+            continue
+        arguments.append(f"--{name}" if value is True else f"--{name}={value}")
+    return arguments
+
+
+class Transport:
+    """
+    Runs the silent installer on one host.
+
+    Subclasses build the command line in command(); run() executes it under the fleet's
+    supervisor and returns (output, returncode) like run_streaming, with the complete output.
+    """
+
+    name = ""
+
+    def command(self, host: str, arguments: list) -> list:
+        raise NotImplementedError
+
+    def environment(self, host: str):
+        return None
+
+    def run(self, host: str, arguments: list, supervisor: ProcessSupervisor):
+        out, err, code = run_streaming(
+            self.command(host, arguments), tail_lines=None, supervisor=supervisor, env=self.environment(host)
+        )
+        return "\n".join(part for part in (out, err) if part), code
+
+
+class CommandTransport(Transport):
+    """A remote transport described by a command template such as FLEET_TRANSPORTS["psexec"]."""
+
+    def __init__(self, template: str, installer: str, name: str = "command"):
+        self.template = template
+        self.installer = installer
+        self.name = name
+
+    def command(self, host: str, arguments: list) -> list:
+        # Split before filling in, so hosts and paths with spaces stay single arguments.
+        return [part.format(host=host, installer=self.installer) for part in self.template.split()] + arguments
+
+
+class LocalTransport(Transport):
+    """
+    Runs every "host" as a local child process, for testing the orchestration itself.
+
+    Each host gets its own TEMP directory below root, so work directories, journals and
+    run history do not mix. Frozen builds start the installer itself and must therefore
+    run elevated; source checkouts run the silent engine directly.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def command(self, host: str, arguments: list) -> list:
+        if getattr(sys, "frozen", False):
+            return [sys.executable] + arguments
+        return [sys.executable, "-c", LOCAL_HOST_SCRIPT, os.path.dirname(os.path.abspath(__file__))] + arguments
+
+    def environment(self, host: str):
+        temp_dir = os.path.join(self.root, re.sub(r"[^\w.-]", "_", host))
+        os.makedirs(temp_dir, exist_ok=True)
+        return dict(os.environ, TEMP=temp_dir, TMP=temp_dir, TMPDIR=temp_dir, UNIVERSAL_RUNTIME_HOST=host)
+
+
+def create_transport(options: dict) -> Transport:
+    """Return the transport named by --transport: local, psexec, ssh or a command template containing {host}."""
+    name = options["transport"]
+    if name == "local":
+        return LocalTransport(os.path.join(tempfile.gettempdir(), "universal_runtime_fleet"))
+    template = FLEET_TRANSPORTS.get(name, name)
+    if "{host}" not in template:
+        raise ValueError(f"Unknown transport {name!r}: use local, {', '.join(FLEET_TRANSPORTS)} or a template with {{host}}")
+    tool = template.split()[0]
+    if not shutil.which(tool):
+        # Otherwise every host would fail the same way.
+        raise ValueError(f"Transport command {tool!r} not found")
+    installer = options["remote_installer"] or installer_path()
+    return CommandTransport(template, installer, name if name in FLEET_TRANSPORTS else "command")
+
+
+class FleetOrchestrator:
+    """
+    Push the silent run to many hosts at once.
+
+    At most concurrency hosts run at a time; a host that runs longer than host_timeout
+    seconds is killed (the transport process tree, e.g. psexec). on_result(result) is
+    called from the worker threads as each host finishes.
+    """
+
+    def __init__(self, transport: Transport, arguments: list, concurrency: int = DEFAULT_FLEET_CONCURRENCY,
+                 host_timeout: float = DEFAULT_HOST_TIMEOUT, on_result=None):
+        self.transport = transport
+        self.arguments = arguments
+        self.concurrency = max(1, concurrency)
+        self.supervisor = ProcessSupervisor(command_timeout=host_timeout)
+        self.on_result = on_result
+
+    def cancel(self):
+        """Kill the running hosts; hosts that have not started yet are reported as cancelled."""
+        self.supervisor.cancel()
+
+    def run_host(self, host: str) -> dict:
+        started = time.monotonic()
+        code = None
+        try:
+            self.supervisor.check()
+            output, code = self.transport.run(host, self.arguments, self.supervisor)
+            status = FLEET_EXIT_STATUS.get(code, "transport_error")
+        except CommandTimeout as e:
+            output, status = str(e), "host_timeout"
+        except RunAborted:
+            output, status = "", "cancelled"
+        except Exception as e:
+            output, status = str(e), "transport_error"
+        result = {
+            "host": host,
+            "status": status,
+            "exit_code": code,
+            "seconds": round(time.monotonic() - started, 1),
+            "log": output,
+        }
+        if self.on_result:
+            self.on_result(result)
+        return result
+
+    def run(self, hosts: list) -> list:
+        """Run every host and return their results in inventory order."""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            try:
+                return list(pool.map(self.run_host, hosts))
+            except BaseException:
+                # Ctrl+C: stop the hosts still running and let the rest drain as cancelled.
+                self.cancel()
+                raise
+
+
+def write_fleet_report(path: str, results: list, options: dict):
+    """Write the aggregated report (summary plus every host's exit code and log) atomically."""
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    data = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "inventory": options["fleet"],
+        "transport": options["transport"],
+        "arguments": host_arguments(options),
+        "summary": summary,
+        "hosts": results,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+    return summary
+
+
+def run_fleet(options: dict) -> int:
+    """
+    The --fleet command: run the silent installer on every host of the inventory.
+
+    With --cache-dir (a share the hosts can read) and no --from-lock, the orchestrator first
+    locks the catalog and downloads every payload once into the share, so the hosts install
+    the same pinned versions from it instead of each downloading them over the WAN.
+    Returns 0 if every host succeeded, 1 if nothing could be started, 2 otherwise.
+    """
+    def log(message):
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+    try:
+        hosts = load_inventory(options["fleet"])
+        transport = create_transport(options)
+    except ValueError as e:
+        log(str(e))
+        return 1
+    local_paths = local_path_options(options) if not isinstance(transport, LocalTransport) else []
+    if local_paths:
+        # The hosts would look for the same path on their own disks and fail one by one.
+        log("The hosts cannot read paths on this machine, use UNC paths (\\\\server\\share\\...) for "
+            + ", ".join(f"--{name} {options[name.replace('-', '_')]}" for name in local_paths) + ". Aborting.")
+        return 1
+    if options["cache_dir"] and not options["from_lock"]:
+        lock_path = os.path.join(options["cache_dir"], LOCK_FILE)
+        log(f"Seeding the shared payload cache {options['cache_dir']}...")
+        if run_lock(dict(options, lock=lock_path)) == 1:
+            log("Could not seed the payload cache. Aborting.")
+            return 1
+        options = dict(options, from_lock=lock_path)
+    arguments = host_arguments(options)
+    done = []
+    done_lock = threading.Lock()
+
+    def on_result(result):
+        with done_lock:
+            done.append(result)
+            log(f"[{len(done)}/{len(hosts)}] {result['host']}: {result['status']} "
+                f"(exit code {result['exit_code']}, {result['seconds']:g} s)")
+
+    log(f"Provisioning {len(hosts)} hosts via {transport.name}, {options['fleet_concurrency']} at a time: "
+        + subprocess.list2cmdline(arguments))
+    orchestrator = FleetOrchestrator(
+        transport, arguments, options["fleet_concurrency"], options["host_timeout"], on_result=on_result
+    )
+    try:
+        results = orchestrator.run(hosts)
+    except KeyboardInterrupt:
+        log("Cancelled.")
+        finished = {result["host"]: result for result in done}
+        results = [finished.get(host) or {"host": host, "status": "cancelled", "exit_code": None, "seconds": 0, "log": ""}
+                   for host in hosts]
+    report_path = options["fleet_report"] or os.path.abspath(FLEET_REPORT_FILE)
+    summary = write_fleet_report(report_path, results, options)
+    log(", ".join(f"{status}: {count}" for status, count in sorted(summary.items())) + f". Report: {report_path}")
+    return 0 if summary.get("ok", 0) == len(hosts) else 2
+
+
+SILENT_SWITCHES = ("/silent", "-silent", "--silent", "/s", "-s")
+
+# Switches without a value ('--flag=value' stores the value instead of True), switches
+# whose value is optional (alone they store True, '--name value' and '--name=value' a path
+# or command), and switches taking a value with the type it is converted to.
+FLAG_OPTIONS = ("reinstall", "bulk", "resume", "report", "plan")
+OPTIONAL_VALUE_OPTIONS = ("trace", "startup-timing", "session-worker", "lock", "from-lock")
+VALUE_OPTIONS = {
+    "download-workers": int,
+    "log-lines": int,
+    "cache-dir": str,
+    "cache-max-mb": int,
+    "journal-max-age": float,
+    "winget-check-ttl": float,
+    "command-timeout": float,
+    "run-timeout": float,
+    "history": str,
+    "fleet": str,
+    "fleet-concurrency": int,
+    "host-timeout": float,
+    "transport": str,
+    "remote-installer": str,
+    "fleet-report": str,
+    "catalog": str,
+    "only": str,
+    "skip": str,
+    "system-profile": str,
+}
+
+
+def is_switch(arg: str) -> bool:
+    """Tell whether a command line argument is a switch rather than the value of the one before it."""
+    name = arg.partition("=")[0].lower()
+    key = name.lstrip("-/")
+    return (
+        arg.startswith("-") or name in SILENT_SWITCHES
+        or (arg.startswith("/") and (key in FLAG_OPTIONS or key in OPTIONAL_VALUE_OPTIONS or key in VALUE_OPTIONS))
+    )
+
+
+def parse_options(argv):
+    """Parse command line switches (case-insensitive, '--name value' or '--name=value')."""
+    options = {
+        "silent": False,
+        "download_workers": DEFAULT_DOWNLOAD_WORKERS,
+        "reinstall": False,
+        "bulk": False,
+        "resume": False,
+        "journal_max_age": DEFAULT_JOURNAL_MAX_AGE_HOURS,
+        "winget_check_ttl": DEFAULT_WINGET_CHECK_TTL_HOURS,
+        "command_timeout": DEFAULT_COMMAND_TIMEOUT,
+        "run_timeout": DEFAULT_RUN_TIMEOUT,
+        "trace": None,
+        "startup_timing": None,
+        "report": False,
+        "session_worker": None,
+        "lock": None,
+        "from_lock": None,
+        "history": None,
+        "fleet": None,
+        "fleet_concurrency": DEFAULT_FLEET_CONCURRENCY,
+        "host_timeout": DEFAULT_HOST_TIMEOUT,
+        "transport": "psexec",
+        "remote_installer": None,
+        "fleet_report": None,
+        "catalog": None,
+        "only": None,
+        "skip": None,
+        "plan": False,
+        "system_profile": None,
+        "log_lines": None,
+        "cache_dir": None,
+        "cache_max_mb": DEFAULT_CACHE_MAX_MB
+    }
+    args = list(argv)
+    i = 0
+    while i < len(args):
+        name, has_value, value = args[i].partition("=")
+        name = name.lower()
+        key = name.lstrip("-/")
+        if name in SILENT_SWITCHES:
+            options["silent"] = True
+        elif key in FLAG_OPTIONS:
+            options[key.replace("-", "_")] = value if has_value else True
+        elif key in OPTIONAL_VALUE_OPTIONS:
+            if not has_value and i + 1 < len(args) and not is_switch(args[i + 1]):
+                i += 1
+                value, has_value = args[i], True
+            options[key.replace("-", "_")] = value if has_value else True
+        elif key in VALUE_OPTIONS:
+            if not has_value and i + 1 < len(args):
+                i += 1
+                value = args[i]
+            convert = VALUE_OPTIONS[key]
+            try:
+                options[key.replace("-", "_")] = max(0, convert(value)) if convert in (int, float) else convert(value)
+            except ValueError:
+                print(f"Ignoring invalid value for {name}: {value!r}")
+        i += 1
+    # Lockfiles default to the installer's folder, so the two can be copied to other machines together.
+    for key in ("lock", "from_lock"):
+        if options[key] is True:
+            options[key] = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0] or __file__)), LOCK_FILE)
+        elif options[key] and not is_shared_path(options[key]):
+            options[key] = os.path.abspath(options[key])
+    # Resolved now: silent mode and the GUI change into their work directory before using them.
+    for key in ("catalog", "system_profile", "cache_dir", "history"):
+        if options[key] and not is_shared_path(options[key]):
+            options[key] = os.path.abspath(options[key])
+    return options
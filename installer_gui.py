@@ -0,0 +1,571 @@
+"""Tk user interface; imported only when the GUI is launched."""
+import os
+import sys
+import asyncio
+import locale
+import threading
+import queue
+import time
+from collections import OrderedDict
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+from tkinter import messagebox
+
+from installer_core import (
+    InstallEngine, LogEvent, ProgressEvent, StatusEvent, LogSink, catalog_path, create_tracer, format_eta,
+    format_size, load_catalog, parse_options, preview_plan, select_programs, winget_available
+)
+
+# Time spent applying queued messages per UI frame, and the poll interval bounds (ms).
+UI_FRAME_BUDGET = 0.012
+UI_POLL_MIN_MS = 16
+UI_POLL_MAX_MS = 250
+
+# Lines kept in the log panel, how many are dropped at once when it overflows,
+# and how many collapsed command outputs stay expandable.
+LOG_PANEL_MAX_LINES = 2000
+LOG_PANEL_TRIM_CHUNK = 200
+LOG_PANEL_MAX_DETAILS = 50
+
+
+def resource_path(relative_path):
+    """
+    Get absolute path to resource, works for development and for PyInstaller packaging.
+    """
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+class InstallerGUI:
+    def __init__(self, root, options=None, log_sink=None):
+        self.root = root
+        self.options = options or parse_options([])
+        self.tracer = create_tracer(self.options, os.getcwd())
+        self.log_max_lines = LOG_PANEL_MAX_LINES if self.options["log_lines"] is None else self.options["log_lines"]
+        self.log_details = OrderedDict()
+        self.detail_counter = 0
+        self.log_sink = log_sink or LogSink("installer_log.txt", header="Installation Log")
+        self.queue = queue.Queue()
+        self.cancelled = False
+        self.installing = False
+        self.engine = None
+        self.pump_scheduled = False
+        self.poll_interval = UI_POLL_MIN_MS
+
+        lang_code = locale.getdefaultlocale()[0]
+        if lang_code and lang_code.startswith("de"):
+            self.lang = {
+                "select_all": "Alle Programme auswählen/abwählen",
+                "vc_select_all": "Alle VC Redists auswählen",
+                "vc_redist_installs": "VC Redist Installationen",
+                "other_installs": "Andere Installationen",
+                "ready": "Bereit",
+                "eta": "Verbleibend: ca. {time}",
+                "install": "Ausgewählte Programme installieren",
+                "preview": "Vorschau",
+                "cancel_install": "Installation abbrechen",
+                "close": "Schließen",
+                "error": "Fehler",
+                "winget_not_installed": "winget ist auf diesem System nicht installiert. Bitte installieren Sie winget und versuchen Sie es erneut.",
+                "winget_not_installed_log": "winget ist nicht installiert.",
+                "no_selection": "Keine Auswahl",
+                "select_one": "Bitte wählen Sie mindestens ein Programm zur Installation aus.",
+                "installation_cancelled": "Installation vom Benutzer abgebrochen.",
+                "installation_completed_with_errors": "Installation mit Fehlern abgeschlossen.",
+                "installation_completed": "Installation abgeschlossen!",
+                "installation_log_end": "Installationsprozess beendet.",
+                "installation_timed_out": "Installation wegen Zeitüberschreitung abgebrochen.",
+                "installation_crashed": "Installation wegen eines Fehlers abgebrochen: {error}",
+                "command_timed_out": "Zeitüberschreitung nach {seconds:g} s, Prozess beendet: {cmd}",
+                "run_timed_out": "Zeitlimit von {seconds:g} s für die Installation erreicht. Breche ab.",
+                "winget_version": "winget Version: {version}",
+                "checking_winget_updates": "Überprüfe winget Aktualisierungen...",
+                "winget_up_to_date": "winget ist aktuell.",
+                "winget_update_output": "winget Update Ausgabe: {output}",
+                "winget_check_cached": "winget {version} wurde kürzlich geprüft, überspringe die Update-Prüfung.",
+                "winget_updating": "Aktualisiere winget auf {version}, Installationen warten darauf...",
+                "installing": "Installiere: {prog}",
+                "already_installed": "{prog} ist bereits installiert. Überspringe.",
+                "error_installing": "Fehler beim Installieren von {prog}: {error}. Versuch, ein Upgrade durchzuführen...",
+                "error_upgrading": "Fehler beim Upgrade von {prog}: {error}",
+                "install_failed": "Installation von {prog} fehlgeschlagen ({reason}, Exit-Code {code}): {error}",
+                "retrying": "{prog}: {reason}, neuer Versuch in {delay:g} s ({attempt}/{attempts})...",
+                "reboot_required": "{prog} benötigt einen Neustart, um die Installation abzuschließen.",
+                "upgraded_successfully": "{prog} wurde erfolgreich geupgradet!",
+                "output_for": "Ausgabe für {cmd}: {output}",
+                "output_summary": "▸ Ausgabe für {cmd} ({lines} Zeilen)",
+                "collapse_output": "Befehlsausgabe einklappen",
+                "downloaded": "{package} heruntergeladen.",
+                "session_unavailable": "winget-Sitzung konnte nicht gestartet werden, starte winget für jeden Befehl einzeln.",
+                "resume_skipped": "{package} wurde im unterbrochenen Lauf bereits installiert. Überspringe.",
+                "locked": "{package} auf {version} festgelegt.",
+                "lock_failed": "{package} konnte nicht aufgelöst werden und fehlt in der Sperrdatei.",
+                "lock_hash_mismatch": "Installationspaket von {package} passt nicht zum Hash der Sperrdatei für {version}, winget übernimmt die Installation.",
+                "bulk_importing": "Installiere {count} Pakete mit einem einzigen winget import...",
+                "bulk_imported": "winget import: {installed} installiert, {remaining} werden einzeln nachinstalliert.",
+                "cache_hit": "{package} {version} aus dem Cache.",
+                "cache_hash_mismatch": "Prüfsumme für {package} stimmt nicht, lade erneut herunter.",
+                "up_to_date": "{package} ist aktuell ({version}). Überspringe.",
+                "pruned_arch": "{package} ist für {arch}, das auf diesem System nicht läuft. Überspringe.",
+                "superseded": "{package} wird durch {by} ersetzt. Überspringe.",
+                "runtime_detected": "{package}: Laufzeit {version} ist bereits installiert. Überspringe.",
+                "preview_install": "installieren",
+                "preview_upgrade": "aktualisieren",
+                "preview_row": "{package}: {action} {version}, Download {download}, ca. {time}\n    {command}",
+                "preview_total": "{count} Befehle, Download {size}{unknown}, ca. {time}.",
+                "preview_empty": "Nichts zu tun: alle ausgewählten Pakete sind installiert und aktuell.",
+                "size_unknown": " (+{count} unbekannter Größe)",
+                "latest": "neueste Version",
+                "cached": "im Cache",
+                "download_failed": "{package} konnte nicht vorab geladen werden, winget lädt es bei der Installation herunter.",
+                "installation_errors": "Installationsfehler",
+                "installation_errors_detail": "Die folgenden Programme konnten nicht installiert werden:\n{failed}\n\nBitte prüfen Sie, ob sie bereits installiert sind.",
+                "success": "Erfolg",
+                "installation_success": "Installation erfolgreich abgeschlossen!"
+            }
+        else:
+            self.lang = {
+                "select_all": "Select/Deselect All Programs",
+                "vc_select_all": "Select All VC Redists",
+                "vc_redist_installs": "VC Redist Installs",
+                "other_installs": "Other Installs",
+                "ready": "Ready",
+                "eta": "Remaining: about {time}",
+                "install": "Install Selected Programs",
+                "preview": "Preview",
+                "cancel_install": "Cancel Installation",
+                "close": "Close",
+                "error": "Error",
+                "winget_not_installed": "winget is not installed on this system. Please install winget and try again.",
+                "winget_not_installed_log": "winget not installed.",
+                "no_selection": "No Selection",
+                "select_one": "Please select at least one program to install.",
+                "installation_cancelled": "Installation cancelled by user.",
+                "installation_completed_with_errors": "Installation completed with errors.",
+                "installation_completed": "Installation completed!",
+                "installation_log_end": "Installation process ended.",
+                "installation_timed_out": "Installation stopped by a time limit.",
+                "installation_crashed": "Installation stopped by an error: {error}",
+                "command_timed_out": "Timed out after {seconds:g} s, process stopped: {cmd}",
+                "run_timed_out": "Installation time limit of {seconds:g} s reached. Stopping.",
+                "winget_version": "winget version: {version}",
+                "checking_winget_updates": "Checking for winget updates...",
+                "winget_up_to_date": "winget is up to date.",
+                "winget_update_output": "winget update output: {output}",
+                "winget_check_cached": "winget {version} was checked recently, skipping the update check.",
+                "winget_updating": "Updating winget to {version}, installs wait for it...",
+                "installing": "Installing: {prog}",
+                "already_installed": "{prog} is already installed. Skipping.",
+                "error_installing": "Error installing {prog}: {error}. Trying upgrade...",
+                "error_upgrading": "Error upgrading {prog}: {error}",
+                "install_failed": "Installing {prog} failed ({reason}, exit code {code}): {error}",
+                "retrying": "{prog}: {reason}, retrying in {delay:g} s ({attempt}/{attempts})...",
+                "reboot_required": "{prog} needs a reboot to finish installing.",
+                "upgraded_successfully": "{prog} upgraded successfully!",
+                "output_for": "Output for {cmd}: {output}",
+                "output_summary": "▸ Output for {cmd} ({lines} lines)",
+                "collapse_output": "Collapse command output",
+                "downloaded": "Downloaded {package}.",
+                "session_unavailable": "The winget worker session could not be started, running one winget process per command.",
+                "resume_skipped": "{package} was completed by the interrupted run. Skipping.",
+                "locked": "Locked {package} at {version}.",
+                "lock_failed": "Could not resolve {package}, it is left out of the lockfile.",
+                "lock_hash_mismatch": "Payload of {package} does not match the lockfile hash of {version}, leaving it to winget.",
+                "bulk_importing": "Installing {count} packages with a single winget import...",
+                "bulk_imported": "winget import: {installed} installed, {remaining} will be retried one at a time.",
+                "cache_hit": "{package} {version} taken from the cache.",
+                "cache_hash_mismatch": "Hash check failed for {package}, downloading it again.",
+                "up_to_date": "{package} is up to date ({version}). Skipping.",
+                "pruned_arch": "{package} is for {arch}, which this system does not run. Skipping.",
+                "superseded": "{package} is superseded by {by}. Skipping.",
+                "runtime_detected": "{package}: runtime {version} is already installed. Skipping.",
+                "preview_install": "install",
+                "preview_upgrade": "upgrade",
+                "preview_row": "{package}: {action} {version}, download {download}, about {time}\n    {command}",
+                "preview_total": "{count} commands, download {size}{unknown}, about {time}.",
+                "preview_empty": "Nothing to do: every selected package is installed and current.",
+                "size_unknown": " (+{count} of unknown size)",
+                "latest": "latest version",
+                "cached": "cached",
+                "download_failed": "Could not prefetch {package}, winget will download it during install.",
+                "installation_errors": "Installation Errors",
+                "installation_errors_detail": "The following programs failed to install:\n{failed}\n\nCheck if these are already installed.",
+                "success": "Success",
+                "installation_success": "Installation has completed successfully!"
+            }
+
+        # Every catalog program gets a checkbox; --only and --skip decide which start checked.
+        self.programs = load_catalog(catalog_path(self.options))
+        selected = select_programs(self.programs, self.options["only"], self.options["skip"])
+        self.vars = [ttk.BooleanVar(value=program in selected) for program in self.programs]
+        self.select_all_var = ttk.BooleanVar(value=True)
+        self.collapse_output_var = ttk.BooleanVar(value=True)
+        self.vc_select_all_var = ttk.BooleanVar(value=True)
+        self.setup_ui()
+
+    def setup_ui(self):
+        top_frame = ttk.Frame(self.root, padding=10)
+        top_frame.pack(fill='x')
+        master_chk = ttk.Checkbutton(
+            top_frame,
+            text=self.lang["select_all"],
+            variable=self.select_all_var,
+            command=self.toggle_all
+        )
+        master_chk.pack(anchor='w')
+
+        group_frame = ttk.Frame(self.root, padding=10)
+        group_frame.pack(fill='both', expand=True)
+
+        vc_frame = ttk.Frame(group_frame)
+        vc_frame.grid(row=0, column=0, sticky="nw")
+        vc_label = ttk.Label(vc_frame, text=self.lang["vc_redist_installs"], font=("Arial", 10, "bold"))
+        vc_label.pack(anchor="w")
+        vc_master_chk = ttk.Checkbutton(
+            vc_frame,
+            text=self.lang["vc_select_all"],
+            variable=self.vc_select_all_var,
+            command=self.toggle_vc_all
+        )
+        vc_master_chk.pack(anchor="w", padx=(10, 0))
+        for i, program in enumerate(self.programs):
+            if program.group == "vc":
+                chk = ttk.Checkbutton(vc_frame, text=program.name, variable=self.vars[i])
+                chk.pack(anchor="w", padx=(20, 0))
+
+        other_frame = ttk.Frame(group_frame)
+        other_frame.grid(row=0, column=1, sticky="ne", padx=(20, 0))
+        other_label = ttk.Label(other_frame, text=self.lang["other_installs"], font=("Arial", 10, "bold"))
+        other_label.pack(anchor="w")
+        for i, program in enumerate(self.programs):
+            if program.group != "vc":
+                chk = ttk.Checkbutton(other_frame, text=program.name, variable=self.vars[i])
+                chk.pack(anchor="w", padx=(10, 0))
+
+        progress_frame = ttk.Frame(self.root, padding=10)
+        progress_frame.pack(fill='both', expand=True)
+        self.progress_current = ttk.Progressbar(progress_frame, orient='horizontal', length=300, mode='determinate')
+        self.progress_current.pack(pady=5)
+        self.progress_total = ttk.Progressbar(progress_frame, orient='horizontal', length=300, mode='determinate')
+        self.progress_total.pack(pady=5)
+        self.eta_label = ttk.Label(progress_frame, text="")
+        self.eta_label.pack()
+        self.status_label = ttk.Label(progress_frame, text=self.lang["ready"])
+        self.status_label.pack(pady=5)
+
+        log_frame = ttk.Frame(self.root, padding=10)
+        log_frame.pack(fill='both', expand=True)
+        self.logger = ttk.ScrolledText(log_frame, height=10, wrap='word')
+        self.logger.pack(fill='both', expand=True)
+        self.logger.tag_configure("summary", underline=True)
+        self.logger.tag_bind("summary", "<Button-1>", self.toggle_log_detail)
+        collapse_chk = ttk.Checkbutton(log_frame, text=self.lang["collapse_output"], variable=self.collapse_output_var)
+        collapse_chk.pack(anchor="w", pady=(5, 0))
+
+        btn_frame = ttk.Frame(self.root, padding=10)
+        btn_frame.pack(fill='both', expand=True)
+        self.install_button = ttk.Button(btn_frame, text=self.lang["install"], command=self.start_installation)
+        self.install_button.pack(side='left', padx=5)
+        self.preview_button = ttk.Button(btn_frame, text=self.lang["preview"], command=self.start_preview)
+        self.preview_button.pack(side='left', padx=5)
+        self.cancel_button = ttk.Button(btn_frame, text=self.lang["cancel_install"], command=self.cancel_installation, state=ttk.DISABLED)
+        self.cancel_button.pack(side='left', padx=5)
+        self.close_button = ttk.Button(btn_frame, text=self.lang["close"], command=self.on_close)
+        self.close_button.pack(side='right', padx=5)
+
+    def on_close(self):
+        """Close the application."""
+        self.root.destroy()
+
+    def toggle_all(self):
+        state = self.select_all_var.get()
+        for var in self.vars:
+            var.set(state)
+        self.vc_select_all_var.set(state)
+
+    def toggle_vc_all(self):
+        state = self.vc_select_all_var.get()
+        for i, program in enumerate(self.programs):
+            if program.group == "vc":
+                self.vars[i].set(state)
+
+    def cancel_installation(self):
+        """Kill the running processes; the buttons come back with the "finished" message."""
+        self.cancelled = True
+        if self.engine:
+            self.engine.cancel()
+        self.append_log(self.lang["installation_cancelled"])
+        self.cancel_button.config(state=ttk.DISABLED)
+
+    def append_log(self, message):
+        """Append a message to the log widget and queue it for the log file (UI thread only)."""
+        self.write_log_batch([{"message": message}])
+
+    def write_log_batch(self, entries):
+        """
+        Insert log entries with a single widget call.
+
+        Entries carrying command output ("summary"/"detail") are shown as one clickable
+        summary line when collapsing is enabled; the log file always gets the full text.
+        """
+        args = []
+        for entry in entries:
+            self.log_sink.write(entry["message"])
+            if entry.get("detail") and self.collapse_output_var.get():
+                self.detail_counter += 1
+                tag = f"detail{self.detail_counter}"
+                self.log_details[tag] = entry["detail"]
+                if len(self.log_details) > LOG_PANEL_MAX_DETAILS:
+                    self.log_details.popitem(last=False)
+                args += [entry["summary"] + "\n", ("summary", tag)]
+            else:
+                args += [entry["message"] + "\n", ()]
+        self.logger.insert('end', *args)
+        self.logger.see('end')
+        self.trim_log()
+
+    def trim_log(self):
+        """Drop the oldest lines in chunks once the panel exceeds its line cap."""
+        line_count = int(self.logger.index('end-1c').split('.')[0])
+        if line_count > self.log_max_lines + LOG_PANEL_TRIM_CHUNK:
+            self.logger.delete('1.0', f'{line_count - self.log_max_lines + 1}.0')
+
+    def toggle_log_detail(self, event=None):
+        """Expand or collapse the command output under the clicked summary line."""
+        tag = next((t for t in self.logger.tag_names("current") if t.startswith("detail")), None)
+        if tag is None:
+            return
+        body = tag + "_body"
+        body_range = self.logger.tag_ranges(body)
+        if body_range:
+            self.logger.delete(*body_range)
+        elif tag in self.log_details:
+            self.logger.insert(f"{tag}.last", self.log_details[tag] + "\n", (body,))
+
+    def start_queue_pump(self):
+        """Start polling the queue; the pump stops by itself once the installation or preview has finished."""
+        self.installing = True
+        if not self.pump_scheduled:
+            self.pump_scheduled = True
+            self.poll_interval = UI_POLL_MIN_MS
+            self.root.after(self.poll_interval, self.process_queue)
+
+    def process_queue(self):
+        """
+        Process queued messages to update the UI.
+
+        Within one frame budget, progress and status messages are coalesced so only
+        the latest value is rendered and log lines are joined into a single insert.
+        The poll interval backs off while the queue stays empty.
+        """
+        deadline = time.perf_counter() + UI_FRAME_BUDGET
+        latest = {}
+        log_lines = []
+        finished = None
+        try:
+            while time.perf_counter() < deadline:
+                msg = self.queue.get_nowait()
+                if msg["type"] == "log":
+                    log_lines.append(msg)
+                elif msg["type"] in ("finished", "preview_finished"):
+                    finished = msg
+                    break
+                else:
+                    latest[msg["type"]] = msg
+        except queue.Empty:
+            pass
+        if log_lines:
+            self.write_log_batch(log_lines)
+        if "status" in latest:
+            self.status_label.config(text=latest["status"]["message"])
+        if "progress_current" in latest:
+            self.progress_current['value'] = latest["progress_current"]["value"]
+        if "progress_total" in latest:
+            self.progress_total['value'] = latest["progress_total"]["value"]
+            eta = latest["progress_total"].get("eta")
+            self.eta_label.config(text=self.lang["eta"].format(time=format_eta(eta)) if eta else "")
+        if finished is not None and finished["type"] == "preview_finished":
+            self.on_preview_finished()
+        elif finished is not None:
+            self.on_installation_finished(finished["failed"], finished["status"], finished.get("error"))
+        if latest or log_lines or finished is not None:
+            self.poll_interval = UI_POLL_MIN_MS
+        else:
+            self.poll_interval = min(self.poll_interval * 2, UI_POLL_MAX_MS)
+        if self.installing or not self.queue.empty():
+            self.root.after(self.poll_interval, self.process_queue)
+        else:
+            self.pump_scheduled = False
+
+    def selected_programs(self):
+        """The checked programs, or None after telling the user why nothing can run."""
+        if not winget_available():
+            messagebox.showerror(self.lang["error"], self.lang["winget_not_installed"])
+            self.append_log(self.lang["winget_not_installed_log"])
+            return None
+        selected_programs = [program for program, var in zip(self.programs, self.vars) if var.get()]
+        if not selected_programs:
+            messagebox.showwarning(self.lang["no_selection"], self.lang["select_one"])
+            return None
+        return selected_programs
+
+    def start_preview(self):
+        """List the commands an installation of the selection would run, without installing anything."""
+        selected_programs = self.selected_programs()
+        if not selected_programs:
+            return
+        self.install_button.config(state=ttk.DISABLED)
+        self.preview_button.config(state=ttk.DISABLED)
+        self.close_button.config(state=ttk.DISABLED)
+        self.start_queue_pump()
+        threading.Thread(target=self.preview_programs, args=(selected_programs,)).start()
+
+    def preview_programs(self, selected_programs):
+        try:
+            rows = preview_plan(
+                self.options, selected_programs, os.getcwd(), lambda kind, **data: self.log_engine_event(kind, data)
+            )
+            for row in rows:
+                self.queue.put({"type": "log", "message": self.lang["preview_row"].format(
+                    package=row["package"],
+                    action=self.lang["preview_" + row["action"]],
+                    version=row["version"] or self.lang["latest"],
+                    download=self.lang["cached"] if row["cached"] else format_size(row["download_bytes"]),
+                    time=format_eta(row["seconds"]),
+                    command=row["command"]
+                )})
+            unknown = sum(1 for row in rows if row["download_bytes"] is None)
+            summary = self.lang["preview_total"].format(
+                count=len(rows),
+                size=format_size(sum(row["download_bytes"] or 0 for row in rows)),
+                unknown=self.lang["size_unknown"].format(count=unknown) if unknown else "",
+                time=format_eta(sum(row["seconds"] for row in rows))
+            ) if rows else self.lang["preview_empty"]
+            self.queue.put({"type": "log", "message": summary})
+            self.queue.put({"type": "status", "message": summary})
+        finally:
+            self.queue.put({"type": "preview_finished"})
+            self.installing = False
+
+    def on_preview_finished(self):
+        """Re-enable the buttons after a preview (runs on the UI thread)."""
+        self.install_button.config(state=ttk.NORMAL)
+        self.preview_button.config(state=ttk.NORMAL)
+        self.close_button.config(state=ttk.NORMAL)
+
+    def start_installation(self):
+        """Initiate the installation process."""
+        # The version and self-update check runs in the background next to the first installs.
+        selected_programs = self.selected_programs()
+        if not selected_programs:
+            return
+        self.cancelled = False
+        self.install_button.config(state=ttk.DISABLED)
+        self.preview_button.config(state=ttk.DISABLED)
+        self.cancel_button.config(state=ttk.NORMAL)
+        self.close_button.config(state=ttk.DISABLED)
+        self.engine = InstallEngine(self.options, os.getcwd(), tracer=self.tracer)
+        self.start_queue_pump()
+        # The engine's event loop runs on this thread; Tk stays on the main thread.
+        installation_thread = threading.Thread(target=self.install_programs, args=(selected_programs,))
+        installation_thread.start()
+
+    def on_engine_event(self, event):
+        """Translate engine events into queue messages for the UI thread."""
+        if isinstance(event, ProgressEvent):
+            kind = "progress_current" if event.scope == "package" else "progress_total"
+            self.queue.put({"type": kind, "value": event.percent, "eta": event.eta})
+        elif isinstance(event, StatusEvent):
+            if event.state == "installing":
+                self.queue.put({"type": "status", "message": self.lang["installing"].format(prog=event.program)})
+        elif isinstance(event, LogEvent):
+            self.log_engine_event(event.kind, event.data)
+
+    def log_engine_event(self, kind, data):
+        if kind == "output_for":
+            self.queue.put({
+                "type": "log",
+                "message": self.lang["output_for"].format(**data),
+                "summary": self.lang["output_summary"].format(cmd=data["cmd"], lines=len(data["output"].splitlines())),
+                "detail": data["output"]
+            })
+        elif kind in self.lang:
+            self.queue.put({"type": "log", "message": self.lang[kind].format(**data)})
+
+    def install_programs(self, selected_programs):
+        engine = self.engine
+
+        async def consume():
+            async for event in engine.run(selected_programs):
+                self.on_engine_event(event)
+
+        status, error = None, None
+        try:
+            asyncio.run(consume())
+            status = engine.status
+        except Exception as e:
+            # Whatever broke, the buttons must come back: "finished" is always posted below.
+            status, error = "error", str(e) or type(e).__name__
+        finally:
+            self.tracer.save()
+            failed_programs = engine.failed
+            if status == "error":
+                message = self.lang["installation_crashed"].format(error=error)
+                self.queue.put({"type": "status", "message": message})
+                self.queue.put({"type": "log", "message": message})
+            elif status == "timeout":
+                self.queue.put({"type": "status", "message": self.lang["installation_timed_out"]})
+                self.queue.put({"type": "log", "message": self.lang["installation_timed_out"]})
+            elif not self.cancelled:
+                if failed_programs:
+                    failed_str = "\n".join(failed_programs)
+                    self.queue.put({"type": "log", "message": self.lang["installation_errors_detail"].format(failed=failed_str)})
+                    self.queue.put({"type": "status", "message": self.lang["installation_completed_with_errors"]})
+                else:
+                    self.queue.put({"type": "status", "message": self.lang["installation_completed"]})
+                    self.queue.put({"type": "log", "message": self.lang["installation_completed"]})
+            else:
+                self.queue.put({"type": "status", "message": self.lang["installation_cancelled"]})
+            self.queue.put({"type": "log", "message": self.lang["installation_log_end"]})
+            self.queue.put({"type": "finished", "failed": failed_programs, "status": status, "error": error})
+            self.installing = False
+
+    def on_installation_finished(self, failed_programs, status="completed", error=None):
+        """Show the summary and re-enable the buttons (runs on the UI thread)."""
+        self.engine = None
+        self.install_button.config(state=ttk.NORMAL)
+        self.preview_button.config(state=ttk.NORMAL)
+        self.cancel_button.config(state=ttk.DISABLED)
+        self.close_button.config(state=ttk.NORMAL)
+        if status == "error":
+            messagebox.showerror(self.lang["error"], self.lang["installation_crashed"].format(error=error))
+            return
+        if status == "timeout":
+            messagebox.showwarning(self.lang["installation_errors"], self.lang["installation_timed_out"])
+            return
+        if self.cancelled:
+            return
+        if failed_programs:
+            messagebox.showwarning(
+                self.lang["installation_errors"],
+                self.lang["installation_errors_detail"].format(failed="\n".join(failed_programs))
+            )
+        else:
+            messagebox.showinfo(self.lang["success"], self.lang["installation_success"])
+
+
+def run_gui(options: dict, log_sink: LogSink):
+    """Create the main window and run the Tk event loop."""
+    root = ttk.Window(themename="flatly")
+    root.title("Universal Runtime Installer by Manily - Improved")
+
+    icon_file = resource_path("logo.ico")
+    try:
+        root.iconbitmap(icon_file)
+    except Exception as e:
+        print("Error setting icon:", e)
+
+    InstallerGUI(root, options, log_sink=log_sink)
+    root.mainloop()
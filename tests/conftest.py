@@ -0,0 +1,91 @@
+"""Shared fixtures: a scripted stand-in for winget and helpers to build catalog programs."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import installer_core  # noqa: E402
+
+
+class ScriptedWinget:
+    """
+    Replaces InstallScheduler.run_command: answers each winget verb with scripted exit codes.
+
+    codes maps (verb, package_id) to a list of exit codes returned one per call; the last
+    one repeats. Unscripted commands succeed. Every call is recorded as (verb, package_id).
+    """
+
+    def __init__(self, codes=None, output=""):
+        self.codes = {key: list(value) for key, value in (codes or {}).items()}
+        self.output = output
+        self.calls = []
+
+    async def __call__(self, command, span, on_progress=None, tail_lines=None):
+        argv = command.split() if isinstance(command, str) else list(command)
+        verb = argv[1] if len(argv) > 1 else argv[0]
+        package_id = argv[argv.index("--id") + 1] if "--id" in argv else None
+        self.calls.append((verb, package_id))
+        codes = self.codes.get((verb, package_id), [0])
+        code = codes.pop(0) if len(codes) > 1 else codes[0]
+        return self.output, "", code
+
+    def count(self, verb):
+        return sum(1 for call_verb, _ in self.calls if call_verb == verb)
+
+
+class RecordingSupervisor(installer_core.ProcessSupervisor):
+    """Records the retry pauses instead of sleeping through them."""
+
+    def __init__(self):
+        super().__init__(command_timeout=0, run_timeout=0)
+        self.sleeps = []
+
+    async def sleep_async(self, seconds):
+        self.sleeps.append(seconds)
+        self.check()
+
+
+def make_programs(*programs, install_args=("--force",)):
+    """
+    Compile a catalog from (key, [package specs]) pairs; a spec is an ID or a dict of package fields.
+    """
+    data = {
+        "format": installer_core.CATALOG_FORMAT,
+        "install_args": list(install_args),
+        "programs": [
+            {
+                "key": key,
+                "name": key.upper(),
+                "packages": [spec if isinstance(spec, dict) else {"id": spec} for spec in packages],
+            }
+            for key, packages in programs
+        ],
+    }
+    return list(installer_core.compile_catalog(data, "test catalog"))
+
+
+@pytest.fixture
+def events():
+    recorded = []
+
+    def on_event(kind, **data):
+        recorded.append((kind, data))
+
+    on_event.recorded = recorded
+    on_event.kinds = lambda: [kind for kind, _ in recorded]
+    return on_event
+
+
+@pytest.fixture
+def make_scheduler(tmp_path, events):
+    """Build an InstallScheduler whose commands go to a ScriptedWinget."""
+    def build(winget=None, **kwargs):
+        kwargs.setdefault("download_workers", 0)
+        kwargs.setdefault("use_index", False)
+        kwargs.setdefault("supervisor", RecordingSupervisor())
+        scheduler = installer_core.InstallScheduler(str(tmp_path), events, **kwargs)
+        scheduler.run_command = winget or ScriptedWinget()
+        return scheduler
+    return build
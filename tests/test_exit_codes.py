@@ -0,0 +1,138 @@
+"""Exit code classification and how the scheduler acts on each result."""
+import os
+
+import pytest
+
+import installer_core as core
+from conftest import ScriptedWinget, make_programs
+
+PACKAGE = "Vendor.Runtime"
+TABLE = sorted(core.EXIT_CODE_RESULTS.items())
+
+
+def table_ids():
+    return [core.format_exit_code(code) for code, _ in TABLE]
+
+
+@pytest.mark.parametrize("code, expected", TABLE, ids=table_ids())
+def test_every_table_entry_is_classified(code, expected):
+    assert core.classify_exit_code(code) == expected
+
+
+@pytest.mark.parametrize("code, expected", [item for item in TABLE if item[0] > 0x7FFFFFFF],
+                         ids=[core.format_exit_code(code) for code, _ in TABLE if code > 0x7FFFFFFF])
+def test_negative_hresults_are_classified_like_unsigned_ones(code, expected):
+    assert core.classify_exit_code(code - 2 ** 32) == expected
+
+
+def test_unknown_codes_are_given_up_on():
+    assert core.classify_exit_code(0x8A15FFFF) == ("failed", core.ACTION_FAIL)
+    assert core.classify_exit_code(1) == ("failed", core.ACTION_FAIL)
+
+
+@pytest.mark.parametrize("code, expected", TABLE, ids=table_ids())
+def test_scheduler_acts_on_every_table_entry(make_scheduler, events, code, expected):
+    outcome, action = expected
+    winget = ScriptedWinget({("install", PACKAGE): [code]})
+    scheduler = make_scheduler(winget)
+    program = make_programs(("runtime", [PACKAGE]))[0]
+
+    result = scheduler.install(program, program.packages[0], None)
+
+    if action == core.ACTION_DONE:
+        assert result == ("already_installed" if outcome in ("already_installed", "no_update") else "installed")
+        assert winget.calls == [("install", PACKAGE)]
+    elif action == core.ACTION_UPGRADE:
+        assert result == "upgraded"
+        assert winget.calls == [("install", PACKAGE), ("upgrade", PACKAGE)]
+        code = 0  # the upgrade's
+    elif action == core.ACTION_RETRY:
+        assert result == "failed"
+        assert winget.calls == [("install", PACKAGE)] * (core.RETRY_ATTEMPTS + 1)
+    else:
+        assert result == "failed"
+        assert winget.calls == [("install", PACKAGE)]
+        assert "install_failed" in events.kinds()
+    assert scheduler.last_exit_code == code
+
+
+def test_retry_backs_off_exponentially_then_gives_up(make_scheduler, events):
+    winget = ScriptedWinget({("install", PACKAGE): [1618]})
+    scheduler = make_scheduler(winget)
+    program = make_programs(("runtime", [PACKAGE]))[0]
+
+    assert scheduler.install(program, program.packages[0], None) == "failed"
+
+    assert winget.count("install") == core.RETRY_ATTEMPTS + 1
+    assert scheduler.supervisor.sleeps == [core.RETRY_BACKOFF * 3 ** i for i in range(core.RETRY_ATTEMPTS)]
+    retries = [data for kind, data in events.recorded if kind == "retrying"]
+    assert [data["attempt"] for data in retries] == list(range(1, core.RETRY_ATTEMPTS + 1))
+    assert {data["reason"] for data in retries} == {"installer_busy"}
+
+
+def test_retry_stops_once_the_command_succeeds(make_scheduler):
+    winget = ScriptedWinget({("install", PACKAGE): [0x8A150008, 0x8A150107, 0]})
+    scheduler = make_scheduler(winget)
+    program = make_programs(("runtime", [PACKAGE]))[0]
+
+    assert scheduler.install(program, program.packages[0], None) == "installed"
+    assert winget.count("install") == 3
+    assert scheduler.supervisor.sleeps == [core.RETRY_BACKOFF, core.RETRY_BACKOFF * 3]
+
+
+@pytest.mark.parametrize("code", [code for code, (_, action) in TABLE if action != core.ACTION_UPGRADE])
+def test_upgrade_fallback_only_follows_an_upgrade_result(make_scheduler, code):
+    winget = ScriptedWinget({("install", PACKAGE): [code]})
+    scheduler = make_scheduler(winget)
+    program = make_programs(("runtime", [PACKAGE]))[0]
+
+    scheduler.install(program, program.packages[0], None)
+
+    assert winget.count("upgrade") == 0
+
+
+def test_planned_upgrade_is_not_upgraded_twice(make_scheduler):
+    winget = ScriptedWinget({("upgrade", PACKAGE): [0x8A150061]})
+    scheduler = make_scheduler(winget)
+    program = make_programs(("runtime", [PACKAGE]))[0]
+    package = program.packages[0]._replace(install=program.packages[0].upgrade)
+
+    assert scheduler.install(program, package, None) == "failed"
+    assert winget.calls == [("upgrade", PACKAGE)]
+
+
+def test_failed_upgrade_fallback_fails_the_package(make_scheduler, events):
+    winget = ScriptedWinget({("install", PACKAGE): [1638], ("upgrade", PACKAGE): [0x8A150011]})
+    scheduler = make_scheduler(winget)
+    program = make_programs(("runtime", [PACKAGE]))[0]
+
+    assert scheduler.install(program, program.packages[0], None) == "failed"
+    assert "error_upgrading" in events.kinds()
+
+
+@pytest.mark.parametrize("code", [1641, 3010, 0x8A150109, 0x8A15010B], ids=core.format_exit_code)
+def test_reboot_required_counts_as_success(make_scheduler, events, tmp_path, code):
+    winget = ScriptedWinget({("install", PACKAGE): [code]})
+    journal = core.InstallJournal(os.path.join(str(tmp_path), core.JOURNAL_FILE))
+    scheduler = make_scheduler(winget, journal=journal)
+    programs = make_programs(("runtime", [PACKAGE]), ("extra", ["Vendor.Other"]))
+
+    failed = scheduler.run(programs)
+
+    assert failed == []
+    assert scheduler.status == "completed"
+    assert ("reboot_required", {"prog": "RUNTIME"}) in events.recorded
+    assert ("package_done", {"prog": "RUNTIME", "success": True}) in events.recorded
+    assert winget.count("upgrade") == 0
+
+
+def test_reboot_required_is_journaled_as_installed(make_scheduler, tmp_path):
+    winget = ScriptedWinget({("install", PACKAGE): [3010], ("install", "Vendor.Other"): [0x8A150105]})
+    journal = core.InstallJournal(os.path.join(str(tmp_path), core.JOURNAL_FILE))
+    scheduler = make_scheduler(winget, journal=journal)
+
+    failed = scheduler.run(make_programs(("runtime", [PACKAGE]), ("extra", ["Vendor.Other"])))
+
+    assert failed == ["EXTRA"]
+    assert journal.succeeded(PACKAGE)
+    assert not journal.succeeded("Vendor.Other")
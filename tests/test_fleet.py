@@ -0,0 +1,161 @@
+"""Fleet runs: paths the hosts cannot read, the orchestrator, its statuses and the report."""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+import installer_core as core
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    path = tmp_path / "hosts.txt"
+    path.write_text("pc1\npc2\n", encoding="utf-8")
+    return str(path)
+
+
+def fleet_options(inventory, *argv):
+    # A template transport whose tool exists everywhere; it must never be started.
+    return core.parse_options(["--fleet", inventory, "--transport", f"{sys.executable} {{host}}", *argv])
+
+
+@pytest.mark.parametrize("argv, expected", [
+    (["--catalog", "catalog.json"], ["catalog"]),
+    (["--from-lock", "lock.json", "--cache-dir", "cache"], ["from-lock", "cache-dir"]),
+    (["--catalog", "\\\\server\\share\\catalog.json", "--cache-dir", "//server/share/cache"], []),
+    ([], []),
+])
+def test_local_paths_are_found(tmp_path, monkeypatch, argv, expected):
+    monkeypatch.chdir(tmp_path)
+
+    assert core.local_path_options(core.parse_options(argv)) == expected
+
+
+def test_remote_fleet_refuses_local_paths(inventory, monkeypatch, capsys):
+    started = []
+    monkeypatch.setattr(core.FleetOrchestrator, "run", lambda self, hosts: started.append(hosts))
+
+    assert core.run_fleet(fleet_options(inventory, "--catalog", inventory)) == 1
+
+    assert started == []
+    assert "--catalog" in capsys.readouterr().out
+
+
+def test_unc_paths_are_forwarded_unchanged(inventory):
+    options = fleet_options(inventory, "--cache-dir", "\\\\server\\runtimes", "--from-lock", "\\\\server\\runtimes\\l.json")
+
+    assert core.local_path_options(options) == []
+    assert "--cache-dir=\\\\server\\runtimes" in core.host_arguments(options)
+
+
+HOST_SCRIPT = (
+    "import sys, time; host = sys.argv[1]; print('running on', host, flush=True); "
+    "time.sleep(30 if host == 'slow' else 0.3); "
+    "sys.exit({'ok': 0, 'aborted': 1, 'failed': 2, 'timed-out': 3}.get(host.rstrip('0123456789'), 7))"
+)
+
+
+class ScriptTransport(core.Transport):
+    """Runs each host as a Python child whose exit code is named by the host, counting how many run at once."""
+
+    name = "script"
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def command(self, host, arguments):
+        return [sys.executable, "-c", HOST_SCRIPT, host] + arguments
+
+    def run(self, host, arguments, supervisor):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            return super().run(host, arguments, supervisor)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def test_orchestrator_caps_concurrency():
+    transport = ScriptTransport()
+    hosts = [f"ok{i}" for i in range(6)]
+
+    results = core.FleetOrchestrator(transport, ["/silent"], concurrency=2).run(hosts)
+
+    assert transport.peak == 2
+    assert [result["host"] for result in results] == hosts
+    assert {result["status"] for result in results} == {"ok"}
+    assert all("running on" in result["log"] for result in results)
+
+
+def test_exit_codes_map_to_statuses():
+    seen = []
+    hosts = ["ok", "aborted", "failed", "timed-out", "weird"]
+
+    results = core.FleetOrchestrator(ScriptTransport(), [], concurrency=5, on_result=seen.append).run(hosts)
+
+    assert [(result["status"], result["exit_code"]) for result in results] == [
+        ("ok", 0), ("aborted", 1), ("failed_packages", 2), ("timed_out", 3), ("transport_error", 7)
+    ]
+    assert sorted(result["host"] for result in seen) == sorted(hosts)
+
+
+def test_slow_hosts_are_killed_at_the_host_timeout():
+    started = time.monotonic()
+
+    results = core.FleetOrchestrator(ScriptTransport(), [], concurrency=2, host_timeout=1).run(["slow", "ok"])
+
+    assert time.monotonic() - started < 15
+    assert [(result["status"], result["exit_code"]) for result in results] == [("host_timeout", None), ("ok", 0)]
+
+
+def test_report_summarises_the_hosts(tmp_path, inventory):
+    options = fleet_options(inventory, "--only", "openal")
+    results = core.FleetOrchestrator(ScriptTransport(), [], concurrency=3).run(["ok", "failed", "failed2"])
+    path = str(tmp_path / "report.json")
+
+    summary = core.write_fleet_report(path, results, options)
+
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    assert summary == report["summary"] == {"ok": 1, "failed_packages": 2}
+    assert report["inventory"] == inventory
+    assert report["arguments"] == ["/silent", "--only=openal"]
+    assert [host["host"] for host in report["hosts"]] == ["ok", "failed", "failed2"]
+    assert report["hosts"][1]["log"] == "running on failed"
+
+
+@pytest.mark.skipif(os.name == "nt", reason="the fake winget shims are POSIX shell scripts")
+def test_local_transport_runs_the_silent_engine_per_host(tmp_path, inventory, monkeypatch, capsys):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    fake_winget = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fake_winget.py")
+    for tool in ("winget", "msiexec"):
+        shim = bin_dir / tool
+        shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{fake_winget}" {tool} "$@"\n', encoding="utf-8")
+        shim.chmod(0o755)
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ.get("PATH", ""))
+    for name in ("FAKE_WINGET_LATENCY", "FAKE_WINGET_INSTALL_SECONDS", "FAKE_MSIEXEC_SECONDS"):
+        monkeypatch.setenv(name, "0")
+    monkeypatch.delenv("FAKE_WINGET_STATE", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    report_path = str(tmp_path / "report.json")
+    options = core.parse_options(
+        ["--fleet", inventory, "--transport", "local", "--only", "openal", "--fleet-report", report_path]
+    )
+
+    assert core.run_fleet(options) == 0
+
+    with open(report_path, encoding="utf-8") as f:
+        report = json.load(f)
+    assert report["summary"] == {"ok": 2}
+    for host in report["hosts"]:
+        assert "Installing OpenAL" in host["log"]
+        assert os.path.isdir(os.path.join(str(tmp_path), "universal_runtime_fleet", host["host"]))
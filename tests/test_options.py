@@ -0,0 +1,79 @@
+"""Command line parsing."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import installer_core as core
+
+
+@pytest.mark.parametrize("name", ["lock", "from-lock", "trace", "startup-timing"])
+def test_optional_values_accept_both_forms(tmp_path, monkeypatch, name):
+    monkeypatch.chdir(tmp_path)
+    key = name.replace("-", "_")
+
+    spaced = core.parse_options([f"--{name}", "x.json", "/silent"])
+    joined = core.parse_options([f"--{name}=x.json", "/silent"])
+
+    assert spaced[key] == joined[key]
+    assert spaced[key] in ("x.json", os.path.join(str(tmp_path), "x.json"))
+    assert spaced["silent"]
+
+
+def test_optional_values_default_when_a_switch_follows():
+    options = core.parse_options(["--from-lock", "/silent", "--trace", "--only", "openal"])
+
+    assert options["from_lock"].endswith(core.LOCK_FILE)
+    assert options["trace"] is True
+    assert options["silent"]
+    assert options["only"] == "openal"
+
+
+def test_session_worker_takes_a_command():
+    assert core.parse_options(["--session-worker", "python stand_in.py"])["session_worker"] == "python stand_in.py"
+    assert core.parse_options(["--session-worker"])["session_worker"] is True
+
+
+def test_flags_do_not_take_the_next_argument():
+    options = core.parse_options(["--reinstall", "--only", "openal"])
+
+    assert options["reinstall"] is True
+    assert options["only"] == "openal"
+
+
+@pytest.mark.parametrize("argv", [
+    ["--plan", "--only", "bogus"],
+    ["/silent", "--skip", "bogus"],
+    ["--system-profile", "missing.json"],
+    ["--from-lock", "missing.json"],
+])
+def test_invalid_command_lines_exit_cleanly(tmp_path, argv):
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Universal runtime installer.py")
+    env = dict(os.environ, TEMP=str(tmp_path), TMP=str(tmp_path), TMPDIR=str(tmp_path))
+    env.pop("DISPLAY", None)
+
+    result = subprocess.run([sys.executable, script, *argv], cwd=str(tmp_path), env=env,
+                            capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 1
+    assert "Traceback" not in result.stdout + result.stderr
+    assert "bogus" in result.stdout or "missing.json" in result.stdout
+
+
+def test_silent_rejection_keeps_the_last_install_log(tmp_path):
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Universal runtime installer.py")
+    work_dir = tmp_path / "universal_runtime_silent"
+    work_dir.mkdir()
+    log = work_dir / "installer_log.txt"
+    log.write_text("All installations completed successfully.\n", encoding="utf-8")
+    env = dict(os.environ, TEMP=str(tmp_path), TMP=str(tmp_path), TMPDIR=str(tmp_path))
+
+    result = subprocess.run([sys.executable, script, "/silent", "--only", "bogus"], cwd=str(tmp_path), env=env,
+                            capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 1
+    lines = log.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "All installations completed successfully."
+    assert lines[-1].endswith("Aborting silent install.") and "bogus" in lines[-1]
+    assert not (work_dir / "installer_log.txt.1.gz").exists()
@@ -0,0 +1,230 @@
+"""Planning: pruning, superseding, detected runtimes, lockfile pins and the --plan preview."""
+import asyncio
+
+import pytest
+
+import installer_core as core
+from conftest import make_programs
+
+VC14_X86 = {"id": "Microsoft.VCRedist.2015+.x86", "arch": "x86", "runtime": "vc14"}
+VC14_X64 = {"id": "Microsoft.VCRedist.2015+.x64", "arch": "x64", "runtime": "vc14"}
+VC12_X86 = {"id": "Microsoft.VCRedist.2013.x86", "arch": "x86", "runtime": "vc12", "min_version": "12.0.40660"}
+
+
+def package_ids(programs):
+    return [package.id for program in programs for package in program.packages]
+
+
+def planning_scheduler(make_scheduler, index=None, **kwargs):
+    """A scheduler whose 'winget list' returns index."""
+    scheduler = make_scheduler(use_index=True, **kwargs)
+
+    async def load_index():
+        return index if index is not None else {}
+
+    scheduler.load_index = load_index
+    return scheduler
+
+
+def test_packages_for_other_architectures_are_pruned(make_scheduler, events):
+    scheduler = make_scheduler(system=core.FakeSystemProvider(["x86"]))
+    programs = make_programs(("vc2015", [VC14_X86, VC14_X64]), ("arm", [{"id": "Vendor.Arm", "arch": "arm64"}]))
+
+    assert package_ids(scheduler.prune(programs)) == [VC14_X86["id"]]
+    assert ("pruned_arch", {"prog": "VC2015", "package": VC14_X64["id"], "arch": "x64"}) in events.recorded
+    assert ("pruned_arch", {"prog": "ARM", "package": "Vendor.Arm", "arch": "arm64"}) in events.recorded
+
+
+def test_unknown_architectures_prune_nothing(make_scheduler):
+    scheduler = make_scheduler(system=core.SystemProvider())
+    programs = make_programs(("vc2015", [VC14_X86, VC14_X64]))
+
+    assert package_ids(scheduler.prune(programs)) == [VC14_X86["id"], VC14_X64["id"]]
+
+
+def test_later_providers_supersede_earlier_ones(make_scheduler, events):
+    scheduler = make_scheduler(system=core.FakeSystemProvider(["x64", "x86"]))
+    old = {"id": "Microsoft.VCRedist.2015.x86", "arch": "x86", "runtime": "vc14"}
+    programs = make_programs(("vc2015", [old]), ("vc2022", [VC14_X86, VC14_X64]))
+
+    assert package_ids(scheduler.prune(programs)) == [VC14_X86["id"], VC14_X64["id"]]
+    assert ("superseded", {"prog": "VC2015", "package": old["id"], "by": VC14_X86["id"]}) in events.recorded
+
+
+def test_providers_only_supersede_within_their_runtime_and_arch(make_scheduler, events):
+    scheduler = make_scheduler(system=core.FakeSystemProvider(["x64", "x86"]))
+    programs = make_programs(("vc2013", [VC12_X86]), ("vc2015", [VC14_X86, VC14_X64]))
+
+    assert package_ids(scheduler.prune(programs)) == [VC12_X86["id"], VC14_X86["id"], VC14_X64["id"]]
+    assert "superseded" not in events.kinds()
+
+
+def test_superseded_providers_that_cannot_run_do_not_count(make_scheduler):
+    scheduler = make_scheduler(system=core.FakeSystemProvider(["x86"]))
+    arm = {"id": "Vendor.Vc14.Arm", "arch": "arm64", "runtime": "vc14"}
+    programs = make_programs(("vc2015", [VC14_X86]), ("arm", [arm]))
+
+    assert package_ids(scheduler.prune(programs)) == [VC14_X86["id"]]
+
+
+def test_detected_runtime_without_min_version_is_current(make_scheduler, events):
+    scheduler = make_scheduler(system=core.FakeSystemProvider(["x86"], {("vc14", "x86"): "14.0.23026"}))
+    programs = make_programs(("vc2015", [VC14_X86]))
+
+    assert scheduler.plan(programs, {}) == []
+    assert events.recorded == [
+        ("runtime_detected", {"prog": "VC2015", "package": VC14_X86["id"], "version": "14.0.23026"})
+    ]
+
+
+@pytest.mark.parametrize("detected, installs", [
+    ("12.0.40660", False),
+    ("12.0.40664", False),
+    ("12.0.21005", True),
+])
+def test_detected_runtime_must_reach_min_version(make_scheduler, events, detected, installs):
+    scheduler = make_scheduler(system=core.FakeSystemProvider(["x86"], {("vc12", "x86"): detected}))
+    programs = make_programs(("vc2013", [VC12_X86]))
+
+    assert package_ids(scheduler.plan(programs, {})) == ([VC12_X86["id"]] if installs else [])
+    assert ("runtime_detected" in events.kinds()) is not installs
+
+
+def test_detected_runtime_of_another_arch_does_not_count(make_scheduler):
+    scheduler = make_scheduler(system=core.FakeSystemProvider(["x64", "x86"], {("vc14", "x86"): "14.40.33810"}))
+    programs = make_programs(("vc2015", [VC14_X86, VC14_X64]))
+
+    assert package_ids(scheduler.plan(programs, {})) == [VC14_X64["id"]]
+
+
+def test_winget_index_decides_install_upgrade_and_skip(make_scheduler, events):
+    scheduler = make_scheduler(system=core.FakeSystemProvider(["x64", "x86"]))
+    index = {
+        "vendor.current": {"version": "1.0", "available": ""},
+        "vendor.outdated": {"version": "1.0", "available": "2.0"},
+    }
+    programs = make_programs(("runtime", ["Vendor.Current", "Vendor.Outdated", "Vendor.Missing"]))
+
+    planned = scheduler.plan(programs, index)[0].packages
+
+    assert [package.id for package in planned] == ["Vendor.Outdated", "Vendor.Missing"]
+    assert planned[0].install == planned[0].upgrade and planned[0].version == "2.0"
+    assert planned[1].install[:2] == ("winget", "install")
+    assert ("up_to_date", {"prog": "RUNTIME", "package": "Vendor.Current", "version": "1.0"}) in events.recorded
+
+
+def locked(version):
+    return {"version": version, "sha256": "0" * 64, "type": "msi"}
+
+
+def test_lock_pins_the_install_command(make_scheduler):
+    scheduler = make_scheduler(lock={"vendor.runtime": locked("1.5")})
+    programs = make_programs(("runtime", ["Vendor.Runtime", "Vendor.Free"]))
+
+    pinned, free = scheduler.apply_lock(programs)[0].packages
+
+    assert pinned.version == "1.5" and pinned.install[-2:] == ("--version", "1.5")
+    assert free.version is None and "--version" not in free.install
+
+
+@pytest.mark.parametrize("installed, available, planned", [
+    ("1.5", "", False),
+    ("1.5", "2.0", False),
+    ("2.0", "", True),
+    ("1.0", "2.0", True),
+])
+def test_lock_decides_over_the_winget_index(make_scheduler, installed, available, planned):
+    scheduler = make_scheduler(lock={"vendor.runtime": locked("1.5")})
+    programs = scheduler.apply_lock(make_programs(("runtime", ["Vendor.Runtime"])))
+    index = {"vendor.runtime": {"version": installed, "available": available}}
+
+    result = scheduler.plan(programs, index)
+
+    assert package_ids(result) == (["Vendor.Runtime"] if planned else [])
+    if planned:
+        # Always the pinned install, never an upgrade to whatever winget offers.
+        assert result[0].packages[0].install[:2] == ("winget", "install")
+        assert result[0].packages[0].version == "1.5"
+
+
+def test_lock_decides_over_a_detected_runtime(make_scheduler):
+    scheduler = make_scheduler(
+        system=core.FakeSystemProvider(["x86"], {("vc14", "x86"): "14.40.33810"}),
+        lock={VC14_X86["id"].lower(): locked("14.42.34433")},
+    )
+    programs = scheduler.apply_lock(make_programs(("vc2015", [VC14_X86])))
+
+    assert package_ids(scheduler.plan(programs, {})) == [VC14_X86["id"]]
+
+
+def test_preview_lists_the_commands_of_a_run(make_scheduler):
+    scheduler = planning_scheduler(
+        make_scheduler,
+        {"vendor.outdated": {"version": "1.0", "available": "2.0"}},
+        system=core.FakeSystemProvider(["x86"], {("vc14", "x86"): "14.40.33810"}),
+        lock={"vendor.pinned": locked("3.1")},
+    )
+    programs = make_programs(
+        ("vc2015", [VC14_X86, VC14_X64]), ("runtime", ["Vendor.Outdated", "Vendor.Missing", "Vendor.Pinned"])
+    )
+
+    rows = scheduler.preview(programs)
+
+    assert [(row["package"], row["action"], row["version"]) for row in rows] == [
+        ("Vendor.Outdated", "upgrade", "2.0"),
+        ("Vendor.Missing", "install", ""),
+        ("Vendor.Pinned", "install", "3.1"),
+    ]
+    assert {row["program"] for row in rows} == {"RUNTIME"}
+    assert rows[0]["command"].startswith("winget upgrade --id Vendor.Outdated")
+    assert rows[2]["command"].endswith("--version 3.1")
+    for row in rows:
+        assert row["cached"] is False
+        assert row["download_bytes"] is None
+        assert row["seconds"] == core.DEFAULT_PACKAGE_SECONDS
+
+
+def test_preview_does_not_install_anything(make_scheduler, tmp_path):
+    journal = core.InstallJournal(str(tmp_path / core.JOURNAL_FILE))
+    scheduler = planning_scheduler(make_scheduler, journal=journal, resume=True)
+
+    asyncio.run(scheduler.preview_async(make_programs(("runtime", ["Vendor.Runtime"]))))
+
+    assert scheduler.run_command.calls == []
+
+
+def test_preview_uses_cached_payloads(make_scheduler):
+    class Cache:
+        def cached_size(self, package_id, version):
+            return 4096 if package_id == "Vendor.Cached" else None
+
+    scheduler = planning_scheduler(make_scheduler, cache=Cache())
+
+    rows = scheduler.preview(make_programs(("runtime", ["Vendor.Cached", "Vendor.Missing"])))
+
+    assert [(row["cached"], row["download_bytes"]) for row in rows] == [(True, 0), (False, None)]
+
+
+def test_format_plan_renders_rows_and_totals():
+    rows = [
+        {"program": "A", "package": "Vendor.Cached", "action": "install", "version": "", "command": "winget install a",
+         "cached": True, "download_bytes": 0, "seconds": 30.0},
+        {"program": "B", "package": "Vendor.Big", "action": "upgrade", "version": "2.0", "command": "winget upgrade b",
+         "cached": False, "download_bytes": 3 * 1024 * 1024, "seconds": 90.0},
+        {"program": "C", "package": "Vendor.New", "action": "install", "version": "", "command": "winget install c",
+         "cached": False, "download_bytes": None, "seconds": 60.0},
+    ]
+
+    lines = core.format_plan(rows).splitlines()
+
+    assert lines[0].split() == ["Package", "Action", "Version", "Download", "Time"]
+    assert lines[1].split() == ["Vendor.Cached", "install", "latest", "cached", "30", "s"]
+    assert lines[2] == "    winget install a"
+    assert lines[3].split() == ["Vendor.Big", "upgrade", "2.0", "3.0", "MB", "1:30", "min"]
+    assert lines[5].split() == ["Vendor.New", "install", "latest", "?", "1:00", "min"]
+    assert lines[-1] == "3 commands, download 3.0 MB (+1 of unknown size), about 3:00 min."
+    assert len({len(line) for line in (lines[1], lines[3], lines[5])}) == 1
+
+
+def test_format_plan_without_work():
+    assert core.format_plan([]) == "Nothing to do: every selected package is installed and current."
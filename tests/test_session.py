@@ -0,0 +1,173 @@
+"""Which winget commands the worker session runs, and what it is sent."""
+import asyncio
+import sys
+
+import pytest
+
+import installer_core as core
+from conftest import ScriptedWinget, make_programs
+
+
+class StubSession:
+    """A usable worker session that records its requests instead of starting PowerShell."""
+
+    usable = True
+
+    def __init__(self, index=None, fail_start=False):
+        self.index = index
+        self.fail_start = fail_start
+        self.requests = []
+
+    handles = staticmethod(core.WingetSession.handles)
+
+    def run_command(self, command, on_progress=None):
+        self.requests.append(core.session_request(command))
+        return "", "", 0
+
+    def installed_index(self):
+        if self.fail_start:
+            self.usable = False
+        return self.index
+
+    def close(self):
+        pass
+
+
+def test_catalog_commands_keep_all_their_options():
+    package = make_programs(("runtime", ["Vendor.Runtime"]))[0].packages[0]
+
+    assert core.session_request(package.install) == (
+        "install", {"package": "Vendor.Runtime", "version": None, "force": True}
+    )
+    assert core.session_request(package.upgrade) == (
+        "upgrade", {"package": "Vendor.Runtime", "version": None, "force": True}
+    )
+
+
+def test_supported_options_are_forwarded():
+    command = ["winget", "install", "--id", "Vendor.Runtime", "--exact", "--scope", "machine",
+               "--override", "/quiet /norestart", "--architecture", "x86", "--accept-package-agreements"]
+
+    op, fields = core.session_request(command)
+
+    assert op == "install"
+    assert fields == {"package": "Vendor.Runtime", "version": None, "force": False,
+                      "scope": "machine", "override": "/quiet /norestart", "architecture": "x86"}
+
+
+@pytest.mark.parametrize("command", [
+    "winget install --id Vendor.Runtime --skip-dependencies",
+    "winget install --id Vendor.Runtime --header x",
+    "winget upgrade --id Vendor.Runtime --scope machine",
+    "winget install --id Vendor.Runtime --version",
+    "winget download --id Vendor.Runtime",
+    "winget install",
+])
+def test_commands_with_options_the_worker_lacks_run_as_processes(command):
+    assert core.session_request(command) is None
+    assert not core.WingetSession.handles(command)
+
+
+def test_packages_with_custom_args_bypass_the_session(make_scheduler, monkeypatch):
+    session = StubSession()
+    winget = ScriptedWinget()
+    scheduler = make_scheduler(session=session)
+    del scheduler.run_command  # back to the real routing
+    programs = make_programs(
+        ("plain", ["Vendor.Plain"]), ("custom", [{"id": "Vendor.Custom", "args": ["--skip-dependencies"]}])
+    )
+
+    async def fake_process(command, **kwargs):
+        return await winget(command, kwargs.get("span"))
+
+    monkeypatch.setattr(core, "run_command_async", fake_process)
+
+    assert scheduler.run(programs) == []
+
+    assert [fields["package"] for _, fields in session.requests] == ["Vendor.Plain"]
+    assert winget.calls == [("install", "Vendor.Custom")]
+
+
+def test_index_fallback_reports_the_unavailable_session(make_scheduler, events, monkeypatch):
+    scheduler = make_scheduler(session=StubSession(fail_start=True))
+
+    async def winget_list(tracer=None, supervisor=None):
+        return {}
+
+    monkeypatch.setattr(core, "load_installed_index_async", winget_list)
+
+    assert asyncio.run(scheduler.load_index()) == {}
+    assert events.kinds() == ["session_unavailable"]
+
+
+# A stand-in worker speaking the session protocol. It sends progress before every answer;
+# with a marker path it answers once, then exits, and refuses to start again.
+STAND_IN = r"""
+import json, os, sys
+marker = sys.argv[1] if len(sys.argv) > 1 else None
+if marker and os.path.exists(marker):
+    sys.exit(3)
+print(json.dumps({"ready": True}), flush=True)
+for line in sys.stdin:
+    req = json.loads(line)
+    print(json.dumps({"id": req["id"], "progress": 50}), flush=True)
+    if req["op"] == "list":
+        reply = {"id": req["id"], "code": 0, "packages": [{"id": "Vendor.Runtime", "version": "1.0"}]}
+    else:
+        reply = {"id": req["id"], "code": 0, "output": "ok " + req["package"]}
+    print(json.dumps(reply), flush=True)
+    if marker:
+        open(marker, "w").close()
+        sys.exit(0)
+"""
+
+
+@pytest.fixture
+def stand_in(tmp_path):
+    path = tmp_path / "stand_in.py"
+    path.write_text(STAND_IN, encoding="utf-8")
+    sessions = []
+
+    def start(*args):
+        session = core.WingetSession([sys.executable, str(path), *args], supervisor=core.ProcessSupervisor())
+        sessions.append(session)
+        return session
+
+    yield start
+    for session in sessions:
+        session.close(kill=True)
+
+
+def test_progress_lines_are_not_taken_for_the_answer(stand_in):
+    session = stand_in()
+    progress = []
+
+    assert session.run_command("winget install --id Vendor.Runtime") == ("ok Vendor.Runtime", "", 0)
+    assert session.run_command("winget install --id Vendor.Runtime", on_progress=progress.append)[2] == 0
+    assert session.installed_index() == {"vendor.runtime": {"version": "1.0", "available": ""}}
+    assert progress == [50]
+
+
+def test_a_worker_that_stays_dead_is_given_up(stand_in, tmp_path):
+    session = stand_in(str(tmp_path / "exited"))
+
+    assert session.run_command("winget install --id Vendor.First")[2] == 0
+    assert session.usable
+
+    assert session.run_command("winget install --id Vendor.Second")[2] == 1
+    assert not session.usable
+
+
+def test_scheduler_falls_back_once_the_worker_is_gone(make_scheduler, events, stand_in, tmp_path, monkeypatch):
+    scheduler = make_scheduler(session=stand_in(str(tmp_path / "exited")))
+    del scheduler.run_command  # back to the real routing
+    winget = ScriptedWinget()
+
+    async def fake_process(command, **kwargs):
+        return await winget(command, kwargs.get("span"))
+
+    monkeypatch.setattr(core, "run_command_async", fake_process)
+
+    assert scheduler.run(make_programs(("first", ["Vendor.First"]), ("second", ["Vendor.Second"]))) == []
+    assert winget.calls == [("install", "Vendor.Second")]
+    assert events.kinds().count("session_unavailable") == 1